@@ -0,0 +1,218 @@
+from board import *
+
+# NumPy is optional. Without it every function here falls back to plain
+# Python loops, which give the same results. It is only imported the first
+# time a batch is large enough to use it, as importing it takes longer than
+# many whole searches.
+numpy = None
+_numpy_checked = False
+
+# Batch evaluation of the cost_table heuristics (h1 and h2) and of whole
+# breadth-first layers, and the two together in layer_costs.
+#
+# A batch is a list of packed configurations (see Board.encode). With NumPy
+# they become the rows of an array of tiles, and the heuristic of every row
+# is found with one table lookup and one sum, so the cost per board is
+# small but each call has a fixed overhead. Small batches, such as the
+# two to four successors of one state, are faster in plain Python (and the
+# searchers update h1 and h2 incrementally instead), so the unit batched
+# here is a whole layer, as in layer_sizes. The crossover is measured by
+# benchmark.batch_crossover.
+
+# batches smaller than this are always evaluated in plain Python. From
+# benchmark.py --batch-crossover with NumPy 2.4, NumPy is faster from 32
+# boards on 3x3 and from 16 on 4x4.
+NUMPY_MIN_BATCH = 32
+
+
+def have_numpy():
+    ''' returns True if NumPy is available, importing it the first time
+    '''
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+    return numpy != None
+
+
+def use_numpy_for(count, size, use_numpy=None):
+    ''' returns True if a batch of count boards of size x size should be
+        handled with NumPy. use_numpy forces the choice when not None.
+        Packed encodings must fit in 64 bits, which rules out boards
+        larger than 4x4.
+    '''
+    if use_numpy == False or (use_numpy == None and count < NUMPY_MIN_BATCH):
+        return False
+    return have_numpy() and puzzle_tables(size).bits * size * size <= 64
+
+
+def batch_costs(codes, table_name, size=3, use_numpy=None):
+    ''' returns the list of heuristic values of the packed configurations
+        in codes, where table_name names the cost table in PuzzleTables
+        (the cost_table attribute of h1 or h2)
+    '''
+    tables = puzzle_tables(size)
+    table = getattr(tables, table_name)
+    if len(codes) == 0:
+        return []
+    if use_numpy_for(len(codes), size, use_numpy):
+        return numpy_costs(codes, table, tables).tolist()
+    bits = tables.bits
+    mask = tables.mask
+    cells = range(tables.num_cells)
+    values = []
+    for code in codes:
+        total = 0
+        for p in cells:
+            total += table[(code >> (bits * p)) & mask][p]
+        values += [total]
+    return values
+
+
+def numpy_tiles(codes, tables):
+    ''' returns a 2-D array with one row per packed configuration in codes,
+        holding the tile at each cell
+    '''
+    codes = numpy.asarray(codes, dtype=numpy.uint64)
+    shifts = numpy.arange(tables.num_cells, dtype=numpy.uint64) * \
+             numpy.uint64(tables.bits)
+    return ((codes[:, None] >> shifts) & numpy.uint64(tables.mask)) \
+           .astype(numpy.intp)
+
+
+def numpy_costs(codes, table, tables):
+    ''' returns an array of the sums of table[tile][cell] over the cells
+        of each packed configuration in codes
+    '''
+    tiles = numpy_tiles(codes, tables)
+    cost = numpy.asarray(table, dtype=numpy.int32)
+    return cost[tiles, numpy.arange(tables.num_cells)].sum(axis=1)
+
+
+def expand_layer(codes, blanks, size=3, use_numpy=None):
+    ''' returns (new_codes, new_blanks): every configuration one move away
+        from the packed configurations in codes, whose blanks are at the
+        cells in blanks. The results may contain duplicates.
+    '''
+    tables = puzzle_tables(size)
+    bits = tables.bits
+    if use_numpy_for(len(codes), size, use_numpy):
+        codes = numpy.asarray(codes, dtype=numpy.uint64)
+        blanks = numpy.asarray(blanks, dtype=numpy.intp)
+        moves = numpy.asarray(tables.move_table, dtype=numpy.intp)
+        new_codes = []
+        new_blanks = []
+        for d in range(4):
+            q = moves[blanks, d]
+            ok = q != -1
+            code = codes[ok]
+            q = q[ok]
+            shift_q = q.astype(numpy.uint64) * numpy.uint64(bits)
+            shift_b = blanks[ok].astype(numpy.uint64) * numpy.uint64(bits)
+            tile = (code >> shift_q) & numpy.uint64(tables.mask)
+            new_codes += [code ^ (tile << shift_q) ^ (tile << shift_b)]
+            new_blanks += [q]
+        return numpy.concatenate(new_codes), numpy.concatenate(new_blanks)
+    mask = tables.mask
+    new_codes = []
+    new_blanks = []
+    for i in range(len(codes)):
+        code = codes[i]
+        blank = blanks[i]
+        for q in tables.neighbors[blank]:
+            tile = (code >> (bits * q)) & mask
+            new_codes += [code ^ (tile << (bits * q)) ^
+                          (tile << (bits * blank))]
+            new_blanks += [q]
+    return new_codes, new_blanks
+
+
+def remove_seen(codes, blanks, seen, use_numpy=None):
+    ''' returns (codes, blanks) without the configurations that are in
+        seen or repeated within codes. seen is a set of codes without NumPy,
+        and a sorted array of codes with it.
+    '''
+    if numpy != None and isinstance(seen, numpy.ndarray):
+        codes = numpy.asarray(codes, dtype=numpy.uint64)
+        codes, first = numpy.unique(codes, return_index=True)
+        blanks = numpy.asarray(blanks)[first]
+        new = ~numpy.isin(codes, seen, assume_unique=True)
+        return codes[new], blanks[new]
+    new_codes = []
+    new_blanks = []
+    repeated = set()
+    for i in range(len(codes)):
+        code = codes[i]
+        if code not in seen and code not in repeated:
+            repeated.add(code)
+            new_codes += [code]
+            new_blanks += [blanks[i]]
+    return new_codes, new_blanks
+
+
+def layers(digitstr, max_depth=-1, use_numpy=None):
+    ''' does a breadth-first search from the board given by digitstr, a
+        whole layer at a time, and yields (size, codes, vectorized) for
+        each layer: the board width, the packed configurations first
+        reached at that depth (an array if vectorized is True, and a list
+        otherwise), starting with the board itself at depth 0. max_depth
+        limits the depth, or -1 for a search of every reachable
+        configuration (only practical for boards up to 3x3).
+    '''
+    board = packed_board(digitstr)
+    size = board.size
+    vectorized = use_numpy_for(NUMPY_MIN_BATCH, size, use_numpy)
+    codes = [board.code]
+    blanks = [board.blank]
+    if vectorized:
+        codes = numpy.asarray(codes, dtype=numpy.uint64)
+    # a move is undone by the opposite move, so the configurations one
+    # move from a layer are in the layer before it or the one after it,
+    # and only the layer before has to be checked for repeats
+    previous = []
+    depth = 0
+    yield size, codes, vectorized
+    while len(codes) > 0 and (max_depth == -1 or depth < max_depth):
+        new_codes, new_blanks = expand_layer(codes, blanks, size, vectorized)
+        if vectorized:
+            seen = numpy.sort(numpy.asarray(previous, dtype=numpy.uint64))
+        else:
+            seen = set(previous)
+        new_codes, new_blanks = remove_seen(new_codes, new_blanks, seen)
+        if len(new_codes) == 0:
+            break
+        previous = codes
+        codes = new_codes
+        blanks = new_blanks
+        depth += 1
+        yield size, codes, vectorized
+
+
+def layer_sizes(digitstr, max_depth=-1, use_numpy=None):
+    ''' returns the list of the number of configurations first reached at
+        each depth of a breadth-first search from the board given by
+        digitstr (see layers)
+    '''
+    return [len(codes) for size, codes, vectorized
+            in layers(digitstr, max_depth, use_numpy)]
+
+
+def layer_costs(digitstr, table_name='manhattan', max_depth=-1,
+                use_numpy=None):
+    ''' returns a list with, for each depth of a breadth-first search from
+        the board given by digitstr (see layers), a dictionary of the 
+        number of configurations at that depth with each heuristic value.
+        table_name names the cost table, as in batch_costs, and each layer
+        is evaluated with one call to it. From the goal, this shows how far
+        h1 or h2 falls short of the true distance.
+    '''
+    distributions = []
+    for size, codes, vectorized in layers(digitstr, max_depth, use_numpy):
+        counts = {}
+        for h in batch_costs(codes, table_name, size, vectorized):
+            counts[h] = counts.get(h, 0) + 1
+        distributions += [counts]
+    return distributions
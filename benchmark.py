@@ -0,0 +1,514 @@
+import argparse
+import batch
+import json
+import os
+import pattern_db
+import platform
+import random
+import solution_table
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from eight_puzzle import *
+
+# A benchmark harness for the searchers.
+#
+# A corpus is a seeded, reproducible set of boards grouped by the number of
+# moves in an optimal solution. Every configuration in CONFIGURATIONS is run
+# over every board of the corpus, and the results are written as JSON so
+# that two runs (e.g. before and after a change) can be compared with
+# compare_results.
+
+# the configurations that are benchmarked: (algorithm, heuristic name,
+# closed_set, depth_limit, deepest optimal depth it is run on or None for
+# every depth). The uninformed searchers are only run on shallow boards,
+# and random and DFS need a depth limit to finish in a reasonable time.
+# The depths are for 3x3 boards. On larger boards the deepest depths and
+# the depth limits are lowered to LARGE_MAX_DEPTH, and configurations whose
+# searcher cannot solve the size (see Searcher.sizes) are skipped.
+CONFIGURATIONS = [('random', None, True, 20, 8),
+                  ('BFS', None, True, -1, 20),
+                  ('DFS', None, True, 20, 20),
+                  ('Greedy', 'h1', True, -1, None),
+                  ('Greedy', 'h2', True, -1, None),
+                  ('Greedy', 'h4', True, -1, None),
+                  ('A*', 'h1', True, -1, 22),
+                  ('A*', 'h2', True, -1, None),
+                  ('A*', 'h3', True, -1, None),
+                  ('A*', 'h4', True, -1, None),
+                  ('wA*', 'h4', True, -1, None),
+                  ('ARA*', 'h4', True, -1, None),
+                  ('IDA*', 'h2', False, -1, 26),
+                  ('IDA*', 'h3', False, -1, None),
+                  ('IDA*', 'h4', False, -1, None),
+                  ('bidirectional', None, False, -1, None),
+                  ('table', None, False, -1, None)]
+
+# the deepest depth and the depth limit of the limited configurations on
+# boards above 3x3
+LARGE_MAX_DEPTH = 8
+
+DEFAULT_DEPTHS = [4, 8, 12, 16, 20, 24, 28]
+
+# a configuration is a regression if its time (or node count) grows by more
+# than this fraction
+DEFAULT_THRESHOLD = 0.10
+
+# times below this many seconds are too noisy to compare
+MIN_TIME = 0.01
+
+
+def make_corpus(depths=DEFAULT_DEPTHS, per_depth=5, seed=0, size=3):
+    ''' returns a dictionary mapping each depth in depths to a list of
+        per_depth board strings whose optimal solutions have that many
+        moves. The same seed always gives the same corpus.
+
+        3x3 boards are drawn from the table of every configuration (see
+        solution_table.py). Larger boards are made by random walks from the
+        goal and kept when IDA* with h4 finds an optimal solution of a
+        wanted length, so only shallow depths are practical for them.
+    '''
+    rng = random.Random(seed)
+    if size == 3:
+        table = solution_table.default_solution_table()
+        # every rank at each wanted depth, in rank order
+        ranks = {}
+        for d in depths:
+            ranks[d] = []
+        for rank in range(solution_table.TABLE_SIZE):
+            entry = table[rank]
+            if entry != solution_table.UNSOLVABLE and entry >> 2 in ranks:
+                ranks[entry >> 2] += [rank]
+        corpus = {}
+        for d in depths:
+            chosen = rng.sample(ranks[d], min(per_depth, len(ranks[d])))
+            corpus[d] = [tiles_string(code_tiles(permutation_unrank(r)))
+                         for r in chosen]
+        return corpus
+
+    corpus = {}
+    for d in depths:
+        corpus[d] = []
+    attempts = 0
+    while any([len(corpus[d]) < per_depth for d in depths]):
+        attempts += 1
+        if attempts > 1000 * per_depth * len(depths):
+            raise ValueError('could not find enough boards at depths ' +
+                             str(depths))
+        # a walk twice as long as the deepest missing depth, that never
+        # undoes its previous move
+        wanted = max([d for d in depths if len(corpus[d]) < per_depth])
+        board = Board(goal_string(size))
+        last = -1
+        for i in range(2 * wanted):
+            d = rng.choice([m for m in range(4)
+                            if (last == -1 or m != OPPOSITE[last]) and
+                            board.successor(DIRECTIONS[m]) is not None])
+            board.move_blank(DIRECTIONS[d])
+            last = d
+        boardstr = board.digit_string()
+        searcher = IDAStarSearcher(-1, h4)
+        goal = searcher.find_solution(State(board, None, 'init'))
+        num_moves = goal.num_moves
+        if num_moves in corpus and len(corpus[num_moves]) < per_depth and \
+           boardstr not in corpus[num_moves]:
+            corpus[num_moves] += [boardstr]
+    return corpus
+
+
+def code_tiles(code):
+    ''' returns the list of tiles of the packed 3x3 configuration code
+    '''
+    return [(code >> (4 * p)) & 15 for p in range(9)]
+
+
+def prepare(size=3):
+    ''' loads (or builds) the tables some searchers use, so that doing so
+        is not counted in the time of the first board
+    '''
+    if size in pattern_db.DEFAULT_PATTERNS:
+        pattern_db.default_pattern_db(size)
+    if size == 3:
+        solution_table.default_solution_table()
+
+
+def run_one(boardstr, algorithm, heuristic, closed_set, depth_limit=-1,
+            memory=False, seed=0):
+    ''' solves one board and returns a dictionary of its measurements.
+        If memory is True, the search is run a second time while tracing
+        memory allocations to find its peak memory use, which is not done
+        during the timed run because tracing slows the search down.
+
+        random is seeded from seed and boardstr before each run, so that
+        the random searcher makes the same choices every time the same
+        corpus is benchmarked.
+    '''
+    searcher = create_searcher(algorithm, depth_limit, heuristic,
+                               closed_set)
+    state = create_state(boardstr)
+    # a string seed, since random.seed hashes it the same way in every run
+    random.seed(str(seed) + ':' + boardstr)
+    start = time.perf_counter()
+    soln = searcher.find_solution(state)
+    elapsed = time.perf_counter() - start
+    result = {'board': boardstr,
+              'num_moves': None if soln == None else soln.num_moves,
+              'nodes': searcher.num_tested,
+              'time': elapsed,
+              'peak_frontier': searcher.max_frontier,
+              'peak_memory': None}
+    if memory:
+        searcher = create_searcher(algorithm, depth_limit, heuristic,
+                                   closed_set)
+        state = create_state(boardstr)
+        random.seed(str(seed) + ':' + boardstr)
+        tracemalloc.start()
+        searcher.find_solution(state)
+        result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmark(corpus, configurations=CONFIGURATIONS, memory=True,
+                  verbose=False, seed=0):
+    ''' runs each configuration over the boards of corpus (see make_corpus)
+        and returns a list with one dictionary of totals per configuration
+        and depth. Configurations that do not apply to the size of the 
+        boards are skipped (see CONFIGURATIONS). seed is the seed of the
+        corpus, which run_one also uses to seed the random searcher.
+    '''
+    results = []
+    size = 3
+    for depth in corpus:
+        if len(corpus[depth]) > 0:
+            size = packed_board(corpus[depth][0]).size
+    for algorithm, hname, closed_set, depth_limit, max_depth in \
+            configurations:
+        sizes = create_searcher(algorithm).sizes
+        if sizes != None and size not in sizes:
+            continue
+        if size > 3 and max_depth != None:
+            max_depth = min(max_depth, LARGE_MAX_DEPTH)
+        if size > 3 and depth_limit != -1:
+            depth_limit = min(depth_limit, LARGE_MAX_DEPTH)
+        heuristic = None
+        if hname != None:
+            heuristic = HEURISTICS[hname]
+        for depth in sorted(corpus):
+            if max_depth != None and depth > max_depth:
+                continue
+            runs = [run_one(b, algorithm, heuristic, closed_set, 
+                            depth_limit, memory, seed)
+                    for b in corpus[depth]]
+            if len(runs) == 0:
+                continue
+            total_time = sum([r['time'] for r in runs])
+            total_nodes = sum([r['nodes'] for r in runs])
+            row = {'algorithm': algorithm,
+                   'heuristic': hname,
+                   'closed_set': closed_set,
+                   'depth_limit': depth_limit,
+                   'depth': depth,
+                   'boards': len(runs),
+                   'solved': len([r for r in runs if r['num_moves'] != None]),
+                   'optimal': len([r for r in runs
+                                   if r['num_moves'] == depth]),
+                   'nodes': total_nodes,
+                   'time': total_time,
+                   'nodes_per_sec': total_nodes / total_time
+                                    if total_time > 0 else None,
+                   'peak_frontier': max_or_none([r['peak_frontier']
+                                                 for r in runs]),
+                   'peak_memory': max_or_none([r['peak_memory']
+                                               for r in runs])}
+            if verbose:
+                print(result_line(row), file=sys.stderr)
+            results += [row]
+    return results
+
+
+def max_or_none(values):
+    ''' returns the largest of values that is not None, or None if there
+        is none
+    '''
+    values = [v for v in values if v != None]
+    if len(values) == 0:
+        return None
+    return max(values)
+
+
+def result_key(row):
+    ''' returns the tuple that identifies a row of results across runs
+    '''
+    return (row['algorithm'], row['heuristic'], row['closed_set'],
+            row['depth_limit'], row['depth'])
+
+
+def result_line(row):
+    ''' returns a one-line summary of a row of results
+    '''
+    s = row['algorithm']
+    if row['heuristic'] != None:
+        s += ' ' + row['heuristic']
+    s += ' depth ' + str(row['depth']) + ': '
+    s += str(row['optimal']) + '/' + str(row['boards']) + ' optimal, '
+    s += str(row['nodes']) + ' nodes, '
+    s += '{:.4f} s'.format(row['time'])
+    if row['nodes_per_sec'] != None:
+        s += ', {:.0f} nodes/s'.format(row['nodes_per_sec'])
+    return s
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    ''' compares two benchmark reports (as returned by benchmark()) and
+        returns a list of strings describing each configuration whose time
+        or node count grew by more than the fraction threshold, or which
+        solved fewer boards optimally. Times are only compared when the new
+        one is at least MIN_TIME, and configurations found in only one of
+        the reports are ignored. raises ValueError if the reports were not
+        run on the same corpus.
+    '''
+    if baseline['corpus'] != current['corpus']:
+        raise ValueError('the reports were run on different corpora')
+    old_rows = {}
+    for row in baseline['results']:
+        old_rows[result_key(row)] = row
+    regressions = []
+    for row in current['results']:
+        old = old_rows.get(result_key(row))
+        if old == None:
+            continue
+        name = result_line(row).split(':')[0]
+        for field in ['time', 'nodes']:
+            if field == 'time' and row['time'] < MIN_TIME:
+                continue
+            if row[field] > old[field] * (1 + threshold):
+                regressions += [name + ': ' + field + ' ' +
+                                str(round(old[field], 4)) + ' -> ' +
+                                str(round(row[field], 4))]
+        if row['optimal'] < old['optimal']:
+            regressions += [name + ': ' + str(row['optimal']) +
+                            ' optimal solutions, was ' + str(old['optimal'])]
+    return regressions
+
+
+def benchmark(depths=DEFAULT_DEPTHS, per_depth=5, seed=0, size=3,
+              configurations=CONFIGURATIONS, memory=True, verbose=False):
+    ''' makes a corpus, runs the benchmark on it and returns the report as a
+        dictionary that can be written with json.dump
+    '''
+    corpus = make_corpus(depths, per_depth, seed, size)
+    prepare(size)
+    results = run_benchmark(corpus, configurations, memory, verbose, seed)
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'size': size,
+            'per_depth': per_depth,
+            # json keys are strings, so the depths are stored that way
+            'corpus': dict([(str(d), corpus[d]) for d in sorted(corpus)]),
+            'results': results}
+
+
+def batch_crossover(batch_sizes=None, size=3, table_name='manhattan',
+                    repeat=5, seed=0):
+    ''' times batch.batch_costs on batches of random boards of each size
+        in batch_sizes, in plain Python and (when it is available) with
+        NumPy, keeping the best of repeat runs. returns a dictionary with a
+        row per batch size and the crossover: the smallest batch size from
+        which NumPy was faster at every larger size, or None.
+    '''
+    if batch_sizes == None:
+        batch_sizes = [2 ** i for i in range(13)]
+    rng = random.Random(seed)
+    n = size * size
+    rows = []
+    for count in batch_sizes:
+        codes = []
+        for i in range(count):
+            tiles = list(range(n))
+            rng.shuffle(tiles)
+            codes += [Board(tiles_string(tiles)).encode()]
+        row = {'batch': count}
+        for name, use_numpy in [('python', False), ('numpy', True)]:
+            if use_numpy and not batch.use_numpy_for(count, size, True):
+                row[name] = None
+                continue
+            best = None
+            for i in range(repeat):
+                start = time.perf_counter()
+                batch.batch_costs(codes, table_name, size, use_numpy)
+                elapsed = time.perf_counter() - start
+                if best == None or elapsed < best:
+                    best = elapsed
+            row[name] = best
+        rows += [row]
+    crossover = None
+    for row in reversed(rows):
+        if row['numpy'] == None or row['numpy'] >= row['python']:
+            break
+        crossover = row['batch']
+    return {'numpy': batch.have_numpy(), 'size': size, 'table': table_name,
+            'rows': rows, 'crossover': crossover}
+
+
+def layer_costs(size=3):
+    ''' returns a dictionary with, for h1 and h2, the number of boards
+        with each heuristic value at each depth from the goal (see
+        batch.layer_costs), every depth for 3x3 boards and up to 
+        LARGE_MAX_DEPTH for larger ones
+    '''
+    max_depth = -1
+    if size > 3:
+        max_depth = LARGE_MAX_DEPTH
+    report = {'numpy': batch.have_numpy(), 'size': size,
+              'max_depth': max_depth}
+    for hname in ['h1', 'h2']:
+        report[hname] = batch.layer_costs(goal_string(size),
+                                          HEURISTICS[hname].cost_table,
+                                          max_depth)
+    return report
+
+
+# the board solved by each process of cold_start, which every configuration
+# solves at once, so that the time measured is mostly the startup
+COLD_START_BOARD = '142358607'
+
+def cold_start(configurations=CONFIGURATIONS, runs=5):
+    ''' returns a dictionary of cold-start measurements: for each 
+        configuration, the median over runs new processes of the total time
+        to run the command line of eight_puzzle.py on COLD_START_BOARD, and
+        of the time its imports and tables took (from its --timing report).
+        'python' is the time of an interpreter that does nothing, which no 
+        change here can remove.
+    '''
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'eight_puzzle.py')
+    def median_time(command):
+        times = []
+        for i in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, capture_output=True)
+            times += [time.perf_counter() - start]
+        return statistics.median(times)
+
+    report = {'python': median_time([sys.executable, '-c', 'pass']),
+              'runs': runs, 'results': []}
+    for algorithm, hname, closed_set, depth_limit, max_depth in \
+        configurations:
+        command = [sys.executable, script, '--timing', '--algorithm',
+                   algorithm, '--depth-limit', str(depth_limit),
+                   COLD_START_BOARD]
+        if hname != None:
+            command += ['--heuristic', hname]
+        if closed_set:
+            command += ['--closed-set']
+        totals = []
+        imports = []
+        tables = []
+        for i in range(runs):
+            start = time.perf_counter()
+            process = subprocess.run(command, check=True, capture_output=True,
+                                     text=True)
+            totals += [time.perf_counter() - start]
+            # startup: <imports> s imports, <tables> s tables
+            words = process.stderr.split()
+            imports += [float(words[1])]
+            tables += [float(words[4])]
+        report['results'] += [{'algorithm': algorithm, 'heuristic': hname,
+                               'total': statistics.median(totals),
+                               'imports': statistics.median(imports),
+                               'tables': statistics.median(tables)}]
+    return report
+
+
+def main(args=None):
+    ''' runs the benchmark from the command line. returns 1 if --compare
+        found a regression, 2 if the baseline cannot be compared, and 0
+        otherwise.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the searchers '
+                                     'on a seeded corpus of boards.')
+    parser.add_argument('--depths', type=int, nargs='+',
+                        default=DEFAULT_DEPTHS,
+                        help='optimal solution depths of the corpus')
+    parser.add_argument('--per-depth', type=int, default=5,
+                        help='boards per depth')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=3,
+                        help='board width (3 for the Eight Puzzle)')
+    parser.add_argument('--algorithms', nargs='+',
+                        help='only run these algorithms')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the traced run that measures peak memory')
+    parser.add_argument('--output', help='write the JSON report here '
+                        'instead of to standard output')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='a JSON report to check this run against')
+    parser.add_argument('--threshold', type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help='allowed fractional growth in time and nodes')
+    parser.add_argument('--batch-crossover', action='store_true',
+                        help='instead, time batched heuristic evaluation '
+                        'with and without NumPy')
+    parser.add_argument('--cold-start', action='store_true',
+                        help='instead, time new processes that solve one '
+                        'board with each configuration')
+    parser.add_argument('--layer-costs', action='store_true',
+                        help='instead, count the boards with each value of '
+                        'h1 and h2 at each depth from the goal')
+    options = parser.parse_args(args)
+
+    if options.cold_start:
+        configurations = CONFIGURATIONS
+        if options.algorithms != None:
+            configurations = [c for c in CONFIGURATIONS
+                              if c[0] in options.algorithms]
+        json.dump(cold_start(configurations), sys.stdout, indent=1)
+        print()
+        return 0
+
+    if options.layer_costs:
+        json.dump(layer_costs(options.size), sys.stdout, indent=1)
+        print()
+        return 0
+
+    if options.batch_crossover:
+        json.dump(batch_crossover(size=options.size), sys.stdout, indent=1)
+        print()
+        return 0
+
+    configurations = CONFIGURATIONS
+    if options.algorithms != None:
+        configurations = [c for c in CONFIGURATIONS
+                          if c[0] in options.algorithms]
+    report = benchmark(options.depths, options.per_depth, options.seed,
+                       options.size, configurations, not options.no_memory,
+                       verbose=True)
+    if options.output != None:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if options.compare != None:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare_results(baseline, report, 
+                                          options.threshold)
+        except ValueError as e:
+            print(options.compare + ': ' + str(e), file=sys.stderr)
+            return 2
+        for line in regressions:
+            print('regression: ' + line, file=sys.stderr)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,24 +1,227 @@
+import math
+import re
+
+# the list of possible moves, in the order successors are generated
+DIRECTIONS = ['up', 'down', 'left', 'right']
+
+# OPPOSITE[d] is the index of the move that undoes move DIRECTIONS[d]
+OPPOSITE = [1, 0, 3, 2]
+
+
+class PuzzleTables:
+    """ A class for the precomputed tables used with boards of one size.
+        Cells are numbered 0 to size * size - 1 in row-major order, and in
+        the goal configuration cell p holds tile p, so the blank is in the
+        upper-left corner.
+    """
+    def __init__(self, size):
+        """ a constructor that computes the tables for size x size boards
+        """
+        n = size * size
+        self.size = size
+        self.num_cells = n
+        # the number of bits per cell in packed encodings (see
+        # Board.encode): enough for the largest tile, and at least 4
+        self.bits = max(4, (n - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+
+        # move_table[p][d] is the cell the blank moves to when it is at
+        # cell p and moves in direction DIRECTIONS[d], or -1 if that move
+        # leaves the grid
+        self.move_table = [[p - size if p // size > 0 else -1,
+                            p + size if p // size < size - 1 else -1,
+                            p - 1 if p % size > 0 else -1,
+                            p + 1 if p % size < size - 1 else -1]
+                           for p in range(n)]
+
+        # neighbors[p] is the list of cells the blank can move to from p
+        self.neighbors = [[q for q in self.move_table[p] if q != -1]
+                          for p in range(n)]
+
+        # manhattan[t][p] is the contribution of tile t at cell p to
+        # num_misplaced_2, i.e. its distance from its goal cell
+        self.manhattan = [[abs(p // size - t // size) +
+                           abs(p % size - t % size) for p in range(n)]
+                          for t in range(n)]
+
+        # misplaced[t][p] is the contribution of tile t at cell p to
+        # num_misplaced
+        self.misplaced = [[1 if t != 0 and t != p else 0 for p in range(n)]
+                          for t in range(n)]
+
+        # the goal configuration, as a 2-D list and packed
+        self.goal_tiles = [[r * size + c for c in range(size)]
+                           for r in range(size)]
+        self.goal_code = sum([t << (self.bits * t) for t in range(n)])
+
+# the tables computed so far, by size
+_tables = {}
+
+def puzzle_tables(size):
+    ''' returns the PuzzleTables for size x size boards, computing them the
+        first time they are needed
+    '''
+    tables = _tables.get(size)
+    if tables == None:
+        tables = PuzzleTables(size)
+        _tables[size] = tables
+    return tables
+
+# the tables for the 3x3 board, which are also available under these names
+TABLES_3 = puzzle_tables(3)
+
+# the goal configuration, with the blank in the upper-left corner
+GOAL_TILES = TABLES_3.goal_tiles
+MOVE_TABLE = TABLES_3.move_table
+NEIGHBORS = TABLES_3.neighbors
+MANHATTAN = TABLES_3.manhattan
+MISPLACED = TABLES_3.misplaced
+GOAL_CODE = TABLES_3.goal_code
+
+# FACTORIALS[i] is i!
+FACTORIALS = [math.factorial(n) for n in range(10)]
+
+def permutation_rank(code):
+    ''' returns the position (0 to 9! - 1) of the packed 3x3 configuration
+        code in the lexicographic order of all arrangements of the tiles
+        0-8, so that tables over every configuration can be indexed by it
+    '''
+    rank = 0
+    used = 0 # a bit for each tile already seen
+    for p in range(9):
+        t = (code >> (4 * p)) & 15
+        # the number of tiles smaller than t that are still to come
+        smaller = t - (used & ((1 << t) - 1)).bit_count()
+        rank += smaller * FACTORIALS[8 - p]
+        used |= 1 << t
+    return rank
+
+def permutation_unrank(rank):
+    ''' returns the packed 3x3 configuration whose permutation_rank is rank
+    '''
+    remaining = list(range(9))
+    code = 0
+    for p in range(9):
+        i, rank = divmod(rank, FACTORIALS[8 - p])
+        code |= remaining.pop(i) << (4 * p)
+    return code
+
+def parse_tiles(digitstr):
+    ''' returns the list of tiles in the input string, in row-major order.
+        Tiles may be separated by commas or whitespace, which is needed once
+        there are tiles above 9; otherwise each character is one tile.
+    '''
+    digitstr = digitstr.strip()
+    if re.search(r'[\s,]', digitstr):
+        return [int(x) for x in re.split(r'[\s,]+', digitstr)]
+    return [int(d) for d in digitstr]
+
+def tiles_string(tiles):
+    ''' returns the string for the input list of tiles that parse_tiles
+        reads back: one digit per tile when every tile is a single digit,
+        and comma-separated otherwise
+    '''
+    if len(tiles) <= 10:
+        return ''.join([str(t) for t in tiles])
+    return ','.join([str(t) for t in tiles])
+
+def goal_string(size=3):
+    ''' returns the string of the goal configuration for size x size boards
+    '''
+    return tiles_string(list(range(size * size)))
+
+def num_inversions(tiles):
+    ''' returns the number of pairs of tiles (ignoring the blank) that
+        appear in the opposite order to the goal in the input list of tiles
+    '''
+    tiles = [t for t in tiles if t != 0]
+    count = 0
+    for i in range(len(tiles)):
+        for j in range(i + 1, len(tiles)):
+            if tiles[i] > tiles[j]:
+                count += 1
+    return count
+
+def tiles_solvable(tiles, size):
+    ''' returns True if the goal can be reached from the size x size board
+        with the input list of tiles. The goal has no inversions and the
+        blank in row 0. A horizontal move never changes the number of
+        inversions, and a vertical move changes it by size - 1. So on a
+        board of odd width the number of inversions must be even, and on a
+        board of even width that number plus the blank's row must be even.
+    '''
+    inversions = num_inversions(tiles)
+    if size % 2 == 1:
+        return inversions % 2 == 0
+    return (inversions + tiles.index(0) // size) % 2 == 0
+
+def num_removed(line):
+    ''' returns the fewest items that must be removed from the input list
+        of numbers to leave it in increasing order, i.e. its length minus
+        the length of its longest increasing subsequence
+    '''
+    # longest[i] is the length of the longest increasing subsequence
+    # ending at line[i]
+    longest = []
+    for i in range(len(line)):
+        best = 1
+        for j in range(i):
+            if line[j] < line[i] and longest[j] + 1 > best:
+                best = longest[j] + 1
+        longest += [best]
+    return len(line) - max(longest + [0])
+
+def tiles_linear_conflict(tiles, size):
+    ''' returns the Manhattan distance of the input list of tiles (not
+        counting the blank) plus two moves for every tile that must leave
+        its goal row or column to let another tile in that line past. Tiles
+        in their goal row that are in the wrong order need vertical moves,
+        and tiles in their goal column horizontal ones, so the rows and the
+        columns can both be added without overestimating.
+    '''
+    total = 0
+    for p in range(len(tiles)):
+        t = tiles[p]
+        if t != 0:
+            total += abs(p // size - t // size) + abs(p % size - t % size)
+    for i in range(size):
+        # the goal columns of the tiles in row i that belong in row i,
+        # and the goal rows of the tiles in column i that belong there
+        row = [t % size for t in tiles[i * size:(i + 1) * size]
+               if t != 0 and t // size == i]
+        col = [t // size for t in tiles[i::size]
+               if t != 0 and t % size == i]
+        total += 2 * (num_removed(row) + num_removed(col))
+    return total
+
 class Board:
-    """ A class for objects that represent an Eight Puzzle board.
+    """ A class for objects that represent an Eight Puzzle board, or more
+        generally a board of any size (e.g. 4x4 for the 15-puzzle).
     """
     def __init__(self, digitstr):
         """ a constructor for a Board object whose configuration
             is specified by the input digitstr
-            input: digitstr is a permutation of the digits 0-9
+            input: digitstr is a permutation of the digits 0-8, or for
+            larger boards a permutation of 0 to size * size - 1 separated
+            by commas or spaces (see parse_tiles)
         """
-        # check that digitstr is 9-character string
-        # containing all digits from 0-9
-        assert(len(digitstr) == 9)
-        for x in range(9):
-            assert(str(x) in digitstr)
+        # check that digitstr contains each tile from 0 up exactly once,
+        # and that there are a square number of them
+        tiles = parse_tiles(digitstr)
+        size = math.isqrt(len(tiles))
+        assert(size >= 2 and size * size == len(tiles))
+        assert(sorted(tiles) == list(range(len(tiles))))
 
-        self.tiles=[[0] * 3 for x in range(3)]
+        self.size = size
+        # the tables for this size, kept so that moves need no lookup
+        self.tables = puzzle_tables(size)
+        self.tiles=[[0] * size for x in range(size)]
         self.blank_r=-1
         self.blank_c=-1
         
-        for r in range(0,3):
-            for c in range(0,3):
-                self.tiles[r][c]=int(digitstr[3*r + c])
+        for r in range(0,size):
+            for c in range(0,size):
+                self.tiles[r][c]=tiles[size*r + c]
                 if self.tiles[r][c] == 0:
                     self.blank_r=r
                     self.blank_c=c
@@ -26,13 +229,15 @@ class Board:
     def __repr__(self):
         '''returns a string representation of a Board object.
         '''
+        # tiles are right-aligned to the width of the largest one
+        width = len(str(self.size * self.size - 1))
         s=''
-        for r in range(0,3):
-            for c in range(0,3):
+        for r in range(0,self.size):
+            for c in range(0,self.size):
                 if self.tiles[r][c] != 0:
-                    s += str(self.tiles[r][c]) + ' '
+                    s += str(self.tiles[r][c]).rjust(width) + ' '
                 else:
-                    s += '_ '
+                    s += '_'.rjust(width) + ' '
             s += '\n'
             
         return s
@@ -44,6 +249,7 @@ class Board:
         '''
         new_row=0
         new_col=0
+        last = self.size - 1 # the last row and column
         
         # upwards
         if(direction =='up'):
@@ -51,7 +257,7 @@ class Board:
             new_row = self.blank_r - 1
             new_col = self.blank_c
             # checks if new coordinates are within the grid
-            if(new_row < 0 or new_row > 2):
+            if(new_row < 0 or new_row > last):
                 return False # returns False if moving upwards is not possible
                 
         # down    
@@ -60,7 +266,7 @@ class Board:
             new_row = self.blank_r + 1
             new_col = self.blank_c
             # checks if new coordinates are within the grid
-            if(new_row < 0 or new_row > 2):
+            if(new_row < 0 or new_row > last):
                 return False
         # leftward 
         elif(direction=='left'):
@@ -68,7 +274,7 @@ class Board:
             new_row = self.blank_r
             new_col = self.blank_c-1
             # checks if new coordinates are within the grid
-            if(new_col<0 or new_col>2):
+            if(new_col<0 or new_col>last):
                 return False
             
         # rightwards
@@ -77,7 +283,7 @@ class Board:
             new_row = self.blank_r
             new_col = self.blank_c + 1
             # checks if new coordinates are within the grid
-            if(new_col<0 or new_col>2):
+            if(new_col<0 or new_col>last):
                 return False
             
         # switches the value in the old blank coordinates to the value at the 
@@ -90,36 +296,96 @@ class Board:
         self.blank_r = new_row
         return True
     
+    def flat_tiles(self):
+        ''' returns the tiles as a single list in row-major order
+        '''
+        tiles = []
+        for row in self.tiles:
+            tiles += row
+        return tiles
+
     def digit_string(self):
-        '''converts the board to a string representation
+        '''converts the board to a string representation, which can be
+           passed back to the constructor
         '''
-        s= ''
-        # loops through the board
-        for r in range(0,3):
-            for c in range(0,3):
-                # adds each character in the board to the string sequentially
-                s += str(self.tiles[r][c]) 
-        return s
+        return tiles_string(self.flat_tiles())
     
     def copy(self):
         '''creates a deep copy of self
         '''
-        # creates a deep copy by creating a new board with the same 
-        # digit_string input
-        board_copy = Board(self.digit_string())
+        # copies the rows directly rather than going through digit_string()
+        # and the validating constructor
+        board_copy = Board.__new__(Board)
+        board_copy.size = self.size
+        board_copy.tables = self.tables
+        board_copy.tiles = [row[:] for row in self.tiles]
+        board_copy.blank_r = self.blank_r
+        board_copy.blank_c = self.blank_c
         return board_copy
     
+    def successor(self,direction,d=None):
+        ''' returns a new board with the blank moved in the input direction,
+            or None if that move is not possible. self is not changed.
+            d is the index of direction in DIRECTIONS, if the caller knows
+            it.
+        '''
+        if d == None:
+            d = DIRECTIONS.index(direction)
+        size = self.size
+        blank_r = self.blank_r
+        blank_c = self.blank_c
+        q = self.tables.move_table[blank_r * size + blank_c][d]
+        if q == -1:
+            return None
+        b = self.copy()
+        # the tile at q moves into the blank's cell
+        r = q // size
+        c = q % size
+        tiles = b.tiles
+        tiles[blank_r][blank_c] = tiles[r][c]
+        tiles[r][c] = 0
+        b.blank_r = r
+        b.blank_c = c
+        return b
+    
+    def is_goal(self):
+        ''' returns True if the board is in the goal configuration
+        '''
+        return self.tiles == self.tables.goal_tiles
+    
+    def blank_cell(self):
+        ''' returns the cell number (r * size + c) of the blank
+        '''
+        return self.blank_r * self.size + self.blank_c
+    
+    def tile_at(self,cell):
+        ''' returns the tile at the input cell number
+        '''
+        return self.tiles[cell // self.size][cell % self.size]
+    
+    def is_solvable(self):
+        ''' returns True if the goal can be reached from this board (see
+            tiles_solvable)
+        '''
+        return tiles_solvable(self.flat_tiles(), self.size)
+    
+    def packed(self):
+        ''' returns a PackedBoard with the same configuration as self
+        '''
+        return packed_board_class(self.size)(self.encode(),
+                                             self.blank_cell())
+    
     def num_misplaced(self):
         ''' returns the number of values in the wrong position
         '''
         count = 0
         # loops through the board
-        for r in range(0,3):
-            for c in range(0,3):
+        for r in range(0,self.size):
+            for c in range(0,self.size):
                 # does not include 0
                 if self.tiles[r][c] != 0:
                     # uses formula to check if the position has the right value
-                    if self.tiles[r][c] != r * 3 + c:
+                    if self.tiles[r][c] != r * self.size + c:
                         count +=1
         return count
     
@@ -128,20 +394,28 @@ class Board:
            inputs:
                other is the second board to check against
         '''
-        # checks if self and other are equal using their digit strings
-        if self.digit_string() == other.digit_string():
-            return True
-        else:
-            return False
+        # compares the 2-D lists directly instead of building digit strings
+        return self.tiles == other.tiles
+    
+    def encode(self):
+        ''' returns a compact integer encoding of the board, using 4 bits
+            per cell on boards up to 4x4, and PuzzleTables.bits on larger 
+            ones. Cell p occupies bits bits * p and up. Two boards have the 
+            same encoding exactly when they are equal.
+        '''
+        bits = self.tables.bits
+        code = 0
+        for r in range(0,self.size):
+            for c in range(0,self.size):
+                code |= self.tiles[r][c] << (bits * (r * self.size + c))
+        return code
         
     def num_misplaced_2(self):
         """ returns a new number as priority. If a number is not at the correct
             place (using GOAL_TITLES as reference), num_misplaced_2 will get the
             necessary value from the correct column and row. 
         """
-        goal_tiles = [[0, 1, 2],
-                      [3, 4, 5],
-                      [6, 7, 8]]
+        size = self.size
         
         new = 0
         # loops through the tiles
@@ -149,20 +423,211 @@ class Board:
             for col in range(len(self.tiles[0])):
                 board_tiles = self.tiles[row][col]
                 # checks if tiles are not the goal tiles
-                if board_tiles != goal_tiles[row][col]:
-                    # adds the absolute value of the row - board tiles // 3
-                    new += abs(row - board_tiles // 3)
-                     # adds the col - board tiles modulo 3
-                    new += abs(col - board_tiles % 3)
+                if board_tiles != row * size + col:
+                    # adds the absolute value of the row - board tiles // size
+                    new += abs(row - board_tiles // size)
+                     # adds the col - board tiles modulo size
+                    new += abs(col - board_tiles % size)
                 else:
                     None
-        return new 
-        
-       
- 
-        
+        return new
 
+    def linear_conflict(self):
+        ''' returns the Manhattan distance with linear conflicts (see
+            tiles_linear_conflict)
+        '''
+        return tiles_linear_conflict(self.flat_tiles(), self.size)
 
+
+def packed_board(digitstr):
+    ''' returns a PackedBoard whose configuration is specified by the input
+        digitstr, validated the same way as the Board constructor
+    '''
+    return Board(digitstr).packed()
+
+
+class PackedBoard:
+    """ A class for Eight Puzzle boards stored as a single integer with
+        4 bits per cell (the same encoding as Board.encode), plus the
+        cell number of the blank. Moves are a few bit operations using
+        the precomputed tables above. Supports the same interface as Board.
+        PackedBoard itself is for 3x3 boards; packed_board_class(size)
+        returns a subclass for other sizes.
+    """
+    # the size of the board and the tables for that size
+    size = 3
+    tables = TABLES_3
+    bits = TABLES_3.bits
+    mask = TABLES_3.mask
+    move_table = TABLES_3.move_table
+
+    def __init__(self, code, blank):
+        """ a constructor for a PackedBoard object
+            inputs:
+              * code - the packed configuration, 4 bits per cell
+              * blank - the cell number (0-8) of the blank
+            use packed_board() or Board.packed() to build one from a string
+        """
+        self.code = code
+        self.blank = blank
         
-        
-                    
\ No newline at end of file
+    @property
+    def tiles(self):
+        ''' the configuration as a 2-D list, built on demand
+        '''
+        size = self.size
+        return [[self.tile_at(r * size + c) for c in range(size)]
+                for r in range(size)]
+    
+    @property
+    def blank_r(self):
+        return self.blank // self.size
+    
+    @property
+    def blank_c(self):
+        return self.blank % self.size
+
+    def flat_tiles(self):
+        ''' returns the tiles as a single list in row-major order
+        '''
+        bits = self.bits
+        mask = self.mask
+        return [(self.code >> (bits * p)) & mask
+                for p in range(self.tables.num_cells)]
+    
+    def __repr__(self):
+        '''returns a string representation of a PackedBoard object, the 
+           same as for a Board object
+        '''
+        width = len(str(self.tables.num_cells - 1))
+        s = ''
+        for p in range(self.tables.num_cells):
+            t = self.tile_at(p)
+            if t != 0:
+                s += str(t).rjust(width) + ' '
+            else:
+                s += '_'.rjust(width) + ' '
+            if p % self.size == self.size - 1:
+                s += '\n'
+        return s
+    
+    def digit_string(self):
+        '''converts the board to a string representation
+        '''
+        return tiles_string(self.flat_tiles())
+    
+    def encode(self):
+        ''' returns the packed configuration
+        '''
+        return self.code
+    
+    def copy(self):
+        '''creates a copy of self
+        '''
+        return self.__class__(self.code, self.blank)
+    
+    def move_blank(self,direction):
+        ''' moves the blank in the input direction, returning True, or 
+            returns False if that move is not possible
+        '''
+        q = self.move_table[self.blank][DIRECTIONS.index(direction)]
+        if q == -1:
+            return False
+        # the blank's cell holds 0, so the tile at q can be moved there
+        # by clearing it at q and setting it at the blank's cell
+        bits = self.bits
+        tile = (self.code >> (bits * q)) & self.mask
+        self.code ^= (tile << (bits * q)) | (tile << (bits * self.blank))
+        self.blank = q
+        return True
+    
+    def successor(self,direction,d=None):
+        ''' returns a new PackedBoard with the blank moved in the input
+            direction, or None if that move is not possible. d is the index
+            of direction in DIRECTIONS, if the caller knows it.
+        '''
+        if d == None:
+            d = DIRECTIONS.index(direction)
+        blank = self.blank
+        q = self.move_table[blank][d]
+        if q == -1:
+            return None
+        code = self.code
+        bits = self.bits
+        tile = (code >> (bits * q)) & self.mask
+        return self.__class__(code ^ (tile << (bits * q)) ^
+                              (tile << (bits * blank)), q)
+    
+    def is_goal(self):
+        ''' returns True if the board is in the goal configuration
+        '''
+        return self.code == self.tables.goal_code
+    
+    def blank_cell(self):
+        ''' returns the cell number of the blank
+        '''
+        return self.blank
+    
+    def tile_at(self,cell):
+        ''' returns the tile at the input cell number
+        '''
+        return (self.code >> (self.bits * cell)) & self.mask
+    
+    def is_solvable(self):
+        ''' returns True if the goal can be reached from this board (see
+            tiles_solvable)
+        '''
+        return tiles_solvable(self.flat_tiles(), self.size)
+    
+    def num_misplaced(self):
+        ''' returns the number of tiles in the wrong position
+        '''
+        count = 0
+        for p in range(self.tables.num_cells):
+            t = self.tile_at(p)
+            if t != 0 and t != p:
+                count += 1
+        return count
+    
+    def num_misplaced_2(self):
+        ''' returns the same value as Board.num_misplaced_2, using the 
+            precomputed manhattan table
+        '''
+        manhattan = self.tables.manhattan
+        bits = self.bits
+        mask = self.mask
+        total = 0
+        for p in range(self.tables.num_cells):
+            total += manhattan[(self.code >> (bits * p)) & mask][p]
+        return total
+
+    def linear_conflict(self):
+        ''' returns the Manhattan distance with linear conflicts (see
+            tiles_linear_conflict)
+        '''
+        return tiles_linear_conflict(self.flat_tiles(), self.size)
+    
+    def __eq__(self,other):
+        '''checks if two boards are the same. other may be a Board or a 
+           PackedBoard.
+        '''
+        return self.code == other.encode()
+    
+    def __hash__(self):
+        return hash(self.code)
+
+
+# the PackedBoard subclasses made so far, by size
+_packed_board_classes = {3: PackedBoard}
+
+def packed_board_class(size):
+    ''' returns the PackedBoard class for size x size boards
+    '''
+    cls = _packed_board_classes.get(size)
+    if cls == None:
+        tables = puzzle_tables(size)
+        cls = type('PackedBoard' + str(size), (PackedBoard,),
+                   {'size': size, 'tables': tables, 'bits': tables.bits,
+                    'mask': tables.mask, 'move_table': tables.move_table})
+        _packed_board_classes[size] = cls
+    return cls
@@ -0,0 +1,103 @@
+import collections
+
+# Resource limits for a search.
+#
+# A Budget is passed to find_solution. The searcher checks it once for each
+# state it tests, and when any part of it runs out the search stops:
+# find_solution returns None and sets the searcher's exceeded attribute to a
+# BudgetExceeded record, which holds the best state found so far.
+
+
+class CancelToken:
+    """ A class for objects that let one thread (or a signal handler) ask a
+        search running in another to stop. Any object with an is_set()
+        method, such as a threading.Event, can be used in its place.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+    def __repr__(self):
+        if self.cancelled:
+            return 'CancelToken: cancelled'
+        return 'CancelToken: not cancelled'
+
+    def cancel(self):
+        ''' asks every search using this token to stop
+        '''
+        self.cancelled = True
+
+    def is_set(self):
+        ''' returns True if cancel() has been called
+        '''
+        return self.cancelled
+
+
+class Budget:
+    """ A class for the limits on one search. Each limit is None when it
+        does not apply. A Budget holds no state of its own, so one can be
+        used for many searches.
+    """
+
+    def __init__(self, max_nodes=None, max_frontier=None, max_memory=None,
+                 time_limit=None, token=None):
+        """ a constructor for a Budget object
+            inputs:
+              * max_nodes - the most states the search may test
+              * max_frontier - the most untested states it may hold
+              * max_memory - the most bytes its states may use, estimated
+                as the number of states kept times bytes_per_node of the
+                initial state
+              * time_limit - the most seconds the search may take
+              * token - a CancelToken (or anything with is_set()) that
+                stops the search when set
+        """
+        self.max_nodes = max_nodes
+        self.max_frontier = max_frontier
+        self.max_memory = max_memory
+        self.time_limit = time_limit
+        self.token = token
+
+    def __repr__(self):
+        """ returns a string representation of the Budget object
+            referred to by self.
+        """
+        limits = []
+        for name in ['max_nodes', 'max_frontier', 'max_memory',
+                     'time_limit']:
+            if getattr(self, name) != None:
+                limits += [name + '=' + str(getattr(self, name))]
+        if self.token != None:
+            limits += ['cancellable']
+        if len(limits) == 0:
+            return 'Budget: unlimited'
+        return 'Budget: ' + ', '.join(limits)
+
+
+def with_time_limit(budget, time_limit):
+    ''' returns a copy of budget (which may be None) whose time_limit is at
+        most time_limit seconds
+    '''
+    if budget == None:
+        return Budget(time_limit=time_limit)
+    if budget.time_limit != None:
+        time_limit = min(time_limit, budget.time_limit)
+    return Budget(budget.max_nodes, budget.max_frontier, budget.max_memory,
+                  time_limit, budget.token)
+
+
+# the record of a search stopped by its budget
+#   * reason - the limit that ran out: 'nodes', 'frontier', 'memory',
+#     'time' or 'cancelled'
+#   * best_state - the state with the lowest heuristic value seen, or None
+#   * best_h - that heuristic value (h2 for the uninformed searchers)
+#   * num_tested - the number of states tested
+#   * elapsed - the time spent searching, in seconds
+BudgetExceeded = collections.namedtuple('BudgetExceeded',
+    ['reason', 'best_state', 'best_h', 'num_tested', 'elapsed'])
+
+
+class BudgetStop(Exception):
+    """ raised inside a searcher whose loop is recursive or nested, to
+        stop it when its budget runs out
+    """
@@ -1,47 +1,114 @@
+import time
+# the time spent importing the solver modules, reported by main --timing.
+# argparse, multiprocessing and csv are imported only by the functions that
+# use them, as together they take longer to import than everything else.
+IMPORT_START = time.perf_counter()
+import collections
+import functools
+import itertools
+import json
+import signal
+import sys
 from searcher import *
 from timer import *
+IMPORT_TIME = time.perf_counter() - IMPORT_START
 
-def create_searcher(algorithm, depth_limit = -1, heuristic = None):
+# the algorithms create_searcher knows
+ALGORITHMS = ['random', 'BFS', 'DFS', 'Greedy', 'A*', 'wA*', 'ARA*', 'IDA*',
+              'bidirectional', 'table']
+
+def create_searcher(algorithm, depth_limit = -1, heuristic = None,
+                    closed_set = False, weight = None):
     """ a function that creates and returns an appropriate searcher object, 
         based on the specified inputs. 
         inputs:
           * algorithm - a string specifying which algorithm to use
           * depth_limit - an optional parameter that specifies a depth limit 
           * heuristic - an optional parameter that passes in a heuristic method
+          * closed_set - an optional parameter that replaces the path-only
+            cycle check with a hashed table of visited boards
+          * weight - an optional parameter giving the heuristic weight of
+            'wA*' (weighted A*) or the first weight of 'ARA*' (anytime
+            repairing A*, which always uses a closed set)
     """
     searcher = None
     
     if algorithm == 'random':
-        searcher = Searcher(depth_limit)
+        searcher = Searcher(depth_limit, closed_set)
     elif algorithm == 'BFS':
-        searcher = BFSearcher(depth_limit)
+        searcher = BFSearcher(depth_limit, closed_set)
     elif algorithm == 'DFS':
-        searcher = DFSearcher(depth_limit)
+        searcher = DFSearcher(depth_limit, closed_set)
     elif algorithm == 'Greedy':
-        searcher = GreedySearcher(depth_limit, heuristic)
+        searcher = GreedySearcher(depth_limit, heuristic, closed_set)
     elif algorithm == 'A*':
-        searcher = AStarSearcher(depth_limit, heuristic)
+        searcher = AStarSearcher(depth_limit, heuristic, closed_set)
+    elif algorithm == 'wA*':
+        if weight == None:
+            weight = DEFAULT_WEIGHT
+        searcher = WeightedAStarSearcher(depth_limit, heuristic, weight,
+                                         closed_set)
+    elif algorithm == 'ARA*':
+        if weight == None:
+            weight = ARA_WEIGHT
+        searcher = ARAStarSearcher(depth_limit, heuristic, weight)
+    elif algorithm == 'IDA*':
+        searcher = IDAStarSearcher(depth_limit, heuristic)
+    elif algorithm == 'bidirectional':
+        searcher = BidirectionalSearcher(depth_limit)
+    elif algorithm == 'table':
+        searcher = TableSearcher(depth_limit)
     else:  
         print('unknown algorithm:', algorithm)
 
     return searcher
 
-def eight_puzzle(init_boardstr, algorithm, depth_limit = -1, heuristic = None):
-    """ a driver function for solving 8 Puzzles that uses state-space search
+def create_state(boardstr, packed = False, lean = False):
+    """ a function that creates and returns the initial state for a board
+        inputs:
+          * boardstr - a string of digits that specifies the configuration,
+            or of comma-separated tiles for boards larger than 3x3
+          * packed - an optional parameter that stores boards as PackedBoard
+            objects instead of Board objects
+          * lean - an optional parameter that uses memory-lean Node objects
+            instead of State objects (boards are then always packed)
+    """
+    if lean:
+        return lean_state(boardstr)
+    elif packed:
+        return State(packed_board(boardstr), None, 'init')
+    else:
+        return State(Board(boardstr), None, 'init')
+
+def eight_puzzle(init_boardstr, algorithm, depth_limit = -1, heuristic = None,
+                 closed_set = False, packed = False, lean = False,
+                 show_moves = False, weight = None):
+    """ a driver function for solving 8 Puzzles (or larger sliding puzzles)
+        that uses state-space search, and returns the goal state found 
+        (or None)
         inputs:
           * init_boardstr - a string of digits that specifies the configuration
             of the board in the initial state
           * algorithm - a string specifying which algorithm to use
           * depth_limit - an optional parameter that specifies a depth limit
           * heuristic - an optional parameter that passes in a heuristic method
+          * closed_set - an optional parameter that selects the hashed
+            closed-set cycle check
+          * packed - an optional parameter that stores boards as
+            PackedBoard objects instead of Board objects
+          * lean - an optional parameter that uses memory-lean Node objects
+          * show_moves - an optional parameter; when True every board of
+            the solution is printed, and otherwise only its moves, as 
+            letters (see moves_string)
+          * weight - an optional parameter, the weight for 'wA*' and 'ARA*'
     """
     
-    init_board = Board(init_boardstr)
-    init_state = State(init_board, None, 'init')
+    init_state = create_state(init_boardstr, packed, lean)
 
-    searcher = create_searcher(algorithm, depth_limit, heuristic)
+    searcher = create_searcher(algorithm, depth_limit, heuristic, closed_set,
+                               weight)
     if searcher == None:
-        return
+        return None
 
     soln = None
     timer = Timer(algorithm)
@@ -54,54 +121,326 @@ def eight_puzzle(init_boardstr, algorithm, depth_limit = -1, heuristic = None):
 
     timer.end()
     print(str(timer) + ', ', end='')
-    print(searcher.num_tested, 'states')
+    print(searcher.num_tested, 'states, ', end='')
+    print(bytes_per_node(init_state), 'bytes per node')
 
-    if soln == None:
+    if searcher.unsolvable:
+        print('The board is not solvable.')
+    elif soln == None:
         print('Failed to find a solution.')
     else:
         print('Found a solution requiring', soln.num_moves, 'moves.')
-        show_steps = input('Show the moves (y/n)? ')
-        if show_steps == 'y':
+        if show_moves:
             soln.print_moves_to()
+        else:
+            print('Moves:', moves_string(moves_to(soln)))
+    return soln
+
+def load_tables(algorithm, heuristic=None, size=3):
+    """ loads (or builds) the precomputed tables that algorithm and heuristic
+        use for boards of width size, and no others: the pattern database
+        for h3 and the solution table for 'table'. Loading them before the
+        first board keeps that time out of its result, and lets the worker
+        processes of solve_stream share them.
+    """
+    puzzle_tables(size)
+    if heuristic == h3 and size in pattern_db.DEFAULT_PATTERNS:
+        pattern_db.default_pattern_db(size)
+    if algorithm == 'table' and size == 3:
+        solution_table.default_solution_table()
+
+def first_board_size(boardstrs):
+    """ returns (size, boardstrs): the width of the first non-blank board in
+        the iterable boardstrs (3 if it cannot be read), and an iterator
+        over all of boardstrs, the first board included
+    """
+    boardstrs = iter(boardstrs)
+    skipped = []
+    for boardstr in boardstrs:
+        skipped += [boardstr]
+        if boardstr.strip() != '':
+            break
+    size = 3
+    if len(skipped) > 0 and skipped[-1].strip() != '':
+        try:
+            size = packed_board(skipped[-1].strip()).size
+        except (AssertionError, ValueError):
+            pass
+    return size, itertools.chain(skipped, boardstrs)
             
-def process_file(filename, algorithm, depth_limit=-1, heuristic=None):
+class TimeLimitExceeded(Exception):
+    """ raised inside a search when its time limit runs out """
+
+def on_time_limit(signum, frame):
+    raise TimeLimitExceeded()
+
+# the record produced for each board by solve_one and solve_stream
+#   * board - the board's digit string
+#   * num_moves - the length of the solution, or None
+#   * moves - the list of moves of the solution, or None
+#   * num_tested - the number of states tested
+#   * elapsed - the time spent on the board, in seconds
+#   * status - 'solved', 'unsolvable' (detected without searching),
+#     'no solution', 'terminated' (interrupted), 'time limit',
+#     'budget exceeded' or 'invalid board' (unreadable, or of a size the
+#     algorithm or heuristic cannot handle)
+#   * reason - for 'budget exceeded', the limit that ran out (see
+#     BudgetExceeded), and otherwise None
+#   * best_h, best_moves - for 'budget exceeded', the heuristic value of 
+#     the best state found and the moves that lead to it
+#   * bound - for an anytime searcher (ARA*), the weight of its last
+#     finished search: the solution is at most bound times as long as an
+#     optimal one, and optimal when it is 1. A time limit or budget can
+#     stop the search before the bound reaches 1. None for other searchers.
+SolveResult = collections.namedtuple('SolveResult',
+    ['board', 'num_moves', 'moves', 'num_tested', 'elapsed', 'status',
+     'reason', 'best_h', 'best_moves', 'bound'],
+    defaults=[None, None, None, None])
+
+def solve_one(boardstr, algorithm, depth_limit=-1, heuristic=None,
+              closed_set=False, packed=False, lean=False, time_limit=None,
+              budget=None, weight=None):
+    """ solves a single board and returns a SolveResult. If time_limit is
+        given, the search is stopped after that many seconds. budget is an
+        optional Budget passed to find_solution, and weight is passed to
+        create_searcher.
+        
+        For an anytime searcher (ARA*) the time limit becomes the budget's
+        time_limit, so the best solution found in time is still returned.
+    """
+    start = time.perf_counter()
+    try:
+        state = create_state(boardstr, packed, lean)
+    except (AssertionError, ValueError):
+        return SolveResult(boardstr, None, None, 0, 0.0, 'invalid board')
+    searcher = create_searcher(algorithm, depth_limit, heuristic, closed_set,
+                               weight)
+    if searcher.sizes != None and state.size not in searcher.sizes:
+        # e.g. a 4x4 board for the 3x3 solution table
+        return SolveResult(boardstr, None, None, 0, 0.0, 'invalid board')
+    if heuristic == h3 and state.size not in pattern_db.DEFAULT_PATTERNS:
+        # h3 has no default pattern database for boards this wide
+        return SolveResult(boardstr, None, None, 0, 0.0, 'invalid board')
+    if searcher.anytime and time_limit != None:
+        budget = with_time_limit(budget, time_limit)
+        time_limit = None
+    soln = None
+    status = 'no solution'
+    # the time limit uses a timer signal, which is only available on Unix
+    use_alarm = time_limit != None and hasattr(signal, 'setitimer')
+    if use_alarm:
+        old_handler = signal.signal(signal.SIGALRM, on_time_limit)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        soln = searcher.find_solution(state, budget)
+        if soln != None:
+            status = 'solved'
+        elif searcher.unsolvable:
+            status = 'unsolvable'
+        elif searcher.exceeded != None:
+            status = 'budget exceeded'
+    except KeyboardInterrupt:
+        status = 'terminated'
+    except TimeLimitExceeded:
+        status = 'time limit'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+    elapsed = time.perf_counter() - start
+    if status == 'budget exceeded':
+        exceeded = searcher.exceeded
+        best_moves = None
+        if exceeded.best_state != None:
+            best_moves = moves_to(exceeded.best_state)
+        return SolveResult(boardstr, None, None, searcher.num_tested, elapsed,
+                           status, exceeded.reason, exceeded.best_h,
+                           best_moves)
+    if soln == None:
+        return SolveResult(boardstr, None, None, searcher.num_tested, elapsed,
+                           status)
+    bound = None
+    if searcher.anytime:
+        bound = searcher.bound
+    return SolveResult(boardstr, soln.num_moves, moves_to(soln),
+                       searcher.num_tested, elapsed, status, bound=bound)
+
+def solve_stream(boardstrs, algorithm, depth_limit=-1, heuristic=None,
+                 closed_set=False, packed=False, lean=False, workers=1,
+                 time_limit=None, ordered=True, budget=None, weight=None):
+    """ a generator that solves each board in the iterable boardstrs (for
+        example an open file, one board per line) and yields a SolveResult
+        for each. Surrounding whitespace is ignored and blank lines are 
+        skipped. Only a few boards per worker are read ahead, so inputs of
+        any size are processed in constant memory.
+        inputs other than those of create_searcher and create_state:
+          * workers - the number of worker processes; with more than 1,
+            the boards are solved in parallel
+          * time_limit - the number of seconds allowed per board
+          * ordered - when False, results are yielded as they complete
+            instead of in input order
+          * budget - a Budget applied to each board. With workers, each 
+            process gets its own copy, so a CancelToken only stops the
+            searches of the process that sets it.
+          * weight - the weight for 'wA*' and 'ARA*'
+    """
+    solve = functools.partial(solve_one, algorithm=str(algorithm),
+                              depth_limit=depth_limit, heuristic=heuristic,
+                              closed_set=closed_set, packed=packed, lean=lean,
+                              time_limit=time_limit, budget=budget,
+                              weight=weight)
+    boardstrs = (line.strip() for line in boardstrs if line.strip() != '')
+    if workers <= 1:
+        for boardstr in boardstrs:
+            yield solve(boardstr)
+        return
+
+    import multiprocessing
+    import queue
+    # loaded before the workers are forked, so that they share the tables
+    size, boardstrs = first_board_size(boardstrs)
+    load_tables(algorithm, heuristic, size)
+    # the number of boards handed to the pool but not yet yielded
+    window = workers * 4
+    pool = multiprocessing.Pool(workers)
+    try:
+        if ordered:
+            pending = collections.deque()
+            for boardstr in boardstrs:
+                pending.append(pool.apply_async(solve, (boardstr,)))
+                if len(pending) >= window:
+                    yield pending.popleft().get()
+            while len(pending) > 0:
+                yield pending.popleft().get()
+        else:
+            # each result, or the exception a worker raised, in the order 
+            # they finish
+            done = queue.Queue()
+            def finished():
+                result = done.get()
+                if isinstance(result, BaseException):
+                    raise result
+                return result
+            in_flight = 0
+            for boardstr in boardstrs:
+                pool.apply_async(solve, (boardstr,), callback=done.put,
+                                 error_callback=done.put)
+                in_flight += 1
+                if in_flight >= window:
+                    yield finished()
+                    in_flight -= 1
+            while in_flight > 0:
+                yield finished()
+                in_flight -= 1
+    finally:
+        pool.terminate()
+        pool.join()
+
+# the columns written by write_results in csv format
+CSV_FIELDS = ['board', 'num_moves', 'moves', 'num_tested', 'elapsed', 'status',
+              'reason', 'best_h', 'best_moves', 'bound']
+
+# the formats write_results can write
+OUTPUT_FORMATS = ['text', 'jsonl', 'csv']
+
+def describe_result(result):
+    """ returns the line process_file prints for the SolveResult result
+    """
+    string = result.board
+    if result.status == 'solved':
+        s = string + ': ' + str(result.num_moves) + ' moves, ' + \
+            str(result.num_tested) + ' states tested'
+        if result.bound != None and result.bound > 1:
+            s += ', at most ' + str(result.bound) + ' times optimal'
+        return s
+    elif result.status == 'unsolvable':
+        return string + ': not solvable'
+    elif result.status == 'no solution':
+        return string + ': no solution'
+    elif result.status == 'time limit':
+        return string + ': time limit exceeded, no solution'
+    elif result.status == 'budget exceeded':
+        s = string + ': ' + result.reason + ' budget exceeded'
+        if result.best_moves != None:
+            s += ', best h = ' + str(result.best_h) + ' after '
+            s += str(len(result.best_moves)) + ' moves'
+        return s
+    elif result.status == 'invalid board':
+        return string + ': invalid board'
+    else: # search is terminated 
+        return string + ':'  + ' search terminated, no solution'
+
+def write_results(results, f, output_format='jsonl'):
+    """ writes each SolveResult in the iterable results to the open file f as
+        it arrives, either as one JSON object per line ('jsonl'), as CSV
+        with a header row ('csv', with the moves separated by spaces), or
+        as the lines of process_file followed by the moves as letters 
+        ('text'). returns the number of results written.
+    """
+    count = 0
+    if output_format == 'csv':
+        import csv
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+    for result in results:
+        if output_format == 'text':
+            line = describe_result(result)
+            if result.moves != None:
+                line += ': ' + moves_string(result.moves)
+            f.write(line + '\n')
+        elif output_format == 'csv':
+            row = list(result)
+            if result.moves != None:
+                row[2] = ' '.join(result.moves)
+            if result.best_moves != None:
+                row[8] = ' '.join(result.best_moves)
+            writer.writerow(row)
+        else:
+            f.write(json.dumps(result._asdict()) + '\n')
+        count += 1
+    return count
+
+def process_file(filename, algorithm, depth_limit=-1, heuristic=None,
+                 closed_set=False, packed=False, lean=False, workers=1,
+                 time_limit=None, ordered=True, budget=None, weight=None):
         """ Opens a file 'filename' and solves it using specified algorithm
-            with default inputs depth_limit = -1 and heuristic = None
+            with default inputs depth_limit = -1, heuristic = None,
+            closed_set = False, packed = False and lean = False, printing 
+            the result for each board and the averages at the end.
+            workers, time_limit, ordered, budget and weight are passed on
+            to solve_stream.
         """
-        # opens file for processing
-        f = open(filename,'r')
         puzzles = 0
+        unsolvable = 0
+        over_budget = 0
         moves = 0
         states_tested = 0
         
-        # loops through the file 
-        for line in f:
-            string = str(line[:-1])
-            board = Board(string) # creates Board object
-            algorithm = str(algorithm) # finds algorithm used
-            state = State(board,None,'init') # creates State object
-            # calls create_searcher
-            searcher = create_searcher(algorithm,depth_limit,heuristic)
-            
-            # looks for solution, soln is None by default
-            soln = None
-            try:
-                soln = searcher.find_solution(state)
-                # if search is None, prints the result
-                if soln == None:
-                    print(string + ': no solution')
-                else:
-                    # prints the string, number of moves needed, states tested 
-                    print(string + ':', soln.num_moves, 'moves,', searcher.\
-                          num_tested, 'states tested')
+        # opens file for processing
+        f = open(filename,'r')
+        results = solve_stream(f, algorithm, depth_limit, heuristic, 
+                               closed_set, packed, lean, workers, time_limit,
+                               ordered, budget, weight)
+        # loops through the results
+        try:
+            for result in results:
+                # prints the string and, if solved, the number of moves 
+                # needed and states tested
+                print(describe_result(result))
+                if result.status == 'solved':
                     # updates the variables
                     puzzles += 1
-                    moves += soln.num_moves
-                    states_tested += searcher.num_tested
-                
-            except KeyboardInterrupt: # search is terminated 
-               print(string + ':'  + ' search terminated, no solution')
-               soln = None
+                    moves += result.num_moves
+                    states_tested += result.num_tested
+                elif result.status == 'unsolvable':
+                    unsolvable += 1
+                elif result.status == 'budget exceeded':
+                    over_budget += 1
+        except KeyboardInterrupt: # the whole batch is terminated
+            print('batch terminated')
+        finally:
+            results.close()
+            f.close()
                 
         # output at the bottom
         if puzzles != 0:
@@ -111,5 +450,120 @@ def process_file(filename, algorithm, depth_limit=-1, heuristic=None):
                   'states tested')
         else:
             print('solved: 0 puzzles')
-        
-        
\ No newline at end of file
+        if unsolvable != 0:
+            print('not solvable:', unsolvable, 'puzzles')
+        if over_budget != 0:
+            print('budget exceeded:', over_budget, 'puzzles')
+
+# the algorithms that need a heuristic, which is h4 unless one is given
+INFORMED = ['Greedy', 'A*', 'wA*', 'ARA*', 'IDA*']
+
+def main(args=None):
+    """ solves the boards given on the command line, or read one per line
+        from a file or standard input, and writes the results. returns 0,
+        or 1 if any board could not be read.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='Solve sliding puzzle '
+                                     'boards given as arguments or read one '
+                                     'per line from a file.')
+    parser.add_argument('boards', nargs='*',
+                        help='boards as digit strings (e.g. 142358607), or '
+                        'comma-separated tiles for boards larger than 3x3')
+    parser.add_argument('-i', '--input', metavar='FILE',
+                        help="a file of boards, one per line ('-' for "
+                        'standard input, the default without boards)')
+    parser.add_argument('-a', '--algorithm', choices=ALGORITHMS,
+                        default='A*')
+    parser.add_argument('--heuristic', choices=sorted(HEURISTICS),
+                        help='the heuristic of ' + ', '.join(INFORMED) +
+                        ' (default: h4)')
+    parser.add_argument('-d', '--depth-limit', type=int, default=-1)
+    parser.add_argument('--weight', type=float,
+                        help='the heuristic weight of wA*, or the first '
+                        'weight of ARA*')
+    parser.add_argument('--closed-set', action='store_true',
+                        help='detect cycles with a table of visited boards')
+    parser.add_argument('--packed', action='store_true',
+                        help='store boards as packed integers')
+    parser.add_argument('--lean', action='store_true',
+                        help='use memory-lean states')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        default='text')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='write the results here instead of to '
+                        'standard output')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='worker processes solving boards in parallel')
+    parser.add_argument('--unordered', action='store_true',
+                        help='with workers, write results as they finish')
+    parser.add_argument('--time-limit', type=float,
+                        help='seconds allowed per board')
+    parser.add_argument('--max-nodes', type=int,
+                        help='states allowed to be tested per board')
+    parser.add_argument('--timing', action='store_true',
+                        help='report the startup and solving times on '
+                        'standard error')
+    options = parser.parse_args(args)
+
+    heuristic = None
+    if options.heuristic != None:
+        heuristic = HEURISTICS[options.heuristic]
+    elif options.algorithm in INFORMED:
+        heuristic = h4
+    budget = None
+    if options.max_nodes != None:
+        budget = Budget(max_nodes=options.max_nodes)
+
+    f = None
+    if len(options.boards) > 0:
+        boardstrs = options.boards
+    elif options.input == None or options.input == '-':
+        boardstrs = sys.stdin
+    else:
+        f = open(options.input)
+        boardstrs = f
+    out = sys.stdout
+    if options.output != None:
+        out = open(options.output, 'w', newline='')
+
+    # the tables are loaded here so that --timing can report them apart
+    start = time.perf_counter()
+    size, boardstrs = first_board_size(boardstrs)
+    load_tables(options.algorithm, heuristic, size)
+    tables_time = time.perf_counter() - start
+
+    statuses = collections.Counter()
+    def count_status(result):
+        statuses[result.status] += 1
+        return result
+
+    start = time.perf_counter()
+    results = solve_stream(boardstrs, options.algorithm, options.depth_limit,
+                           heuristic, options.closed_set, options.packed,
+                           options.lean, options.workers, options.time_limit,
+                           not options.unordered, budget, options.weight)
+    try:
+        write_results(map(count_status, results), out, options.format)
+    except KeyboardInterrupt: # the whole batch is terminated
+        print('batch terminated', file=sys.stderr)
+    finally:
+        results.close()
+        if f != None:
+            f.close()
+        if out != sys.stdout:
+            out.close()
+    solve_time = time.perf_counter() - start
+
+    if options.timing:
+        print('startup: {:.4f} s imports, {:.4f} s tables'.format(
+              IMPORT_TIME, tables_time), file=sys.stderr)
+        print('solved {} of {} boards in {:.4f} s'.format(
+              statuses['solved'], sum(statuses.values()), solve_time),
+              file=sys.stderr)
+    if statuses['invalid board'] > 0:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import heapq
+import random
+from collections import deque
+
+class Frontier:
+    """ A base class for the containers that hold a Searcher's untested
+        states. Subclasses decide which state pop() returns; all of them
+        push and pop in constant (or, for PriorityFrontier, logarithmic) time.
+    """
+
+    def __init__(self):
+        '''constructs an empty frontier
+        '''
+        self.num_pushed = 0 # number of states pushed so far
+        self.num_popped = 0 # number of states popped so far
+        self.max_len = 0 # the most states held at once so far
+
+    def __len__(self):
+        '''returns the number of untested states in the frontier
+        '''
+        return len(self.items)
+
+    def push(self, state):
+        '''adds state to the frontier
+        '''
+        self.num_pushed += 1
+        self.items.append(state)
+        if len(self.items) > self.max_len:
+            self.max_len = len(self.items)
+
+    def pop(self):
+        '''removes and returns the next state to be tested
+        '''
+        raise NotImplementedError
+
+    def take_all(self):
+        '''removes every state from the frontier and returns them as a 
+           list, in no particular order
+        '''
+        states = list(self.items)
+        self.items.clear()
+        return states
+
+class FIFOFrontier(Frontier):
+    '''A frontier that returns states in first in first out order
+    '''
+    def __init__(self):
+        Frontier.__init__(self)
+        self.items = deque()
+
+    def pop(self):
+        self.num_popped += 1
+        return self.items.popleft()
+
+class LIFOFrontier(Frontier):
+    '''A frontier that returns states in last in first out order
+    '''
+    def __init__(self):
+        Frontier.__init__(self)
+        self.items = []
+
+    def pop(self):
+        self.num_popped += 1
+        return self.items.pop()
+
+class RandomFrontier(Frontier):
+    '''A frontier that returns a randomly chosen state
+    '''
+    def __init__(self):
+        Frontier.__init__(self)
+        self.items = []
+
+    def pop(self):
+        # swaps the chosen state with the last one so that it can be
+        # removed from the end of the list
+        self.num_popped += 1
+        items = self.items
+        i = random.randrange(len(items))
+        items[i], items[-1] = items[-1], items[i]
+        return items.pop()
+
+class PriorityFrontier(Frontier):
+    '''A frontier that returns the state with the highest priority. Among
+       equal priorities the most recently pushed state comes out first.
+    '''
+    def __init__(self):
+        Frontier.__init__(self)
+        self.items = [] # a binary heap of [key, state] entries
+
+    def push(self, state, priority):
+        '''adds state to the frontier with the given priority
+        '''
+        # heapq is a min-heap, so both parts of the key are negated. This
+        # reproduces the order max() gave on the old list of [priority,
+        # state] pairs, where the later of two equal priorities won.
+        self.num_pushed += 1
+        heapq.heappush(self.items, [(-priority, -self.num_pushed), state])
+        if len(self.items) > self.max_len:
+            self.max_len = len(self.items)
+
+    def pop(self):
+        self.num_popped += 1
+        return heapq.heappop(self.items)[1]
+
+    def take_all(self):
+        states = [entry[1] for entry in self.items]
+        self.items = []
+        return states
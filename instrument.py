@@ -0,0 +1,173 @@
+import time
+
+# Instrumentation for the searchers.
+#
+# A searcher is instrumented by instrument(searcher), which attaches a
+# SearchStats object to it. The loop of Searcher.find_solution then times
+# each of its phases and counts what happens to the states. When
+# instrumentation is off the cost is a few checks of a local variable for
+# each state tested.
+
+# the phases of the search loop that are timed
+PHASES = ['pop', 'goal', 'successors', 'filter', 'push', 'priority']
+
+
+class SearchStats:
+    """ A class for the statistics of one instrumented search: the time
+        spent in each phase of the search loop, counters of the states
+        generated, pruned and pushed, and an optional progress callback.
+    """
+
+    def __init__(self, progress=None, interval=1.0):
+        """ a constructor for a SearchStats object
+            inputs:
+              * progress - an optional function that is called with this
+                object every interval seconds while the search runs
+              * interval - the number of seconds between progress calls
+        """
+        self.progress = progress
+        self.interval = interval
+        self.searcher = None # the searcher being measured
+        self.start_time = 0.0
+        self.last_progress = 0.0 # when progress was last called
+        self.tested_before = 0 # the searcher's num_tested at the start
+        self.times = {} # the seconds spent in each of PHASES
+        for phase in PHASES:
+            self.times[phase] = 0.0
+        self.elapsed = 0.0 # the seconds spent in find_solution
+        self.tested = 0 # states popped and tested
+        self.stale = 0 # states popped but skipped, as a shorter path exists
+        self.generated = 0 # successors generated
+        self.pruned_depth = 0 # successors over the depth limit
+        self.pruned_cycle = 0 # successors rejected as repeated boards
+        self.pushed = 0 # states added to the frontier
+        self.peak_frontier = 0 # the most states in the frontier at once
+
+    def __repr__(self):
+        """ returns a string representation of the SearchStats object
+            referred to by self.
+        """
+        s = 'SearchStats: ' + str(self.tested) + ' tested, '
+        s += str(self.generated) + ' generated, '
+        s += str(self.pruned_depth) + ' pruned by depth, '
+        s += str(self.pruned_cycle) + ' pruned by cycle, '
+        s += str(self.pushed) + ' pushed, '
+        s += 'peak frontier ' + str(self.peak_frontier) + ', '
+        s += '{:.4f} seconds'.format(self.elapsed)
+        return s
+
+    def report(self):
+        ''' returns a multi-line report of the counters and of the time
+            spent in each phase
+        '''
+        s = repr(self) + '\n'
+        for phase in PHASES:
+            s += '  {:<11}{:10.4f} s'.format(phase, self.times[phase])
+            if self.elapsed > 0:
+                s += '{:7.1f}%'.format(100 * self.times[phase] /
+                                       self.elapsed)
+            s += '\n'
+        s += '  (push includes priority)\n'
+        return s
+
+    def as_dict(self):
+        ''' returns the statistics as a dictionary, e.g. to be written as
+            JSON
+        '''
+        d = {'elapsed': self.elapsed, 'times': dict(self.times)}
+        for name in ['tested', 'stale', 'generated', 'pruned_depth',
+                     'pruned_cycle', 'pushed', 'peak_frontier']:
+            d[name] = getattr(self, name)
+        return d
+
+    def nodes_per_sec(self):
+        ''' returns the number of states tested per second
+        '''
+        if self.elapsed == 0:
+            return 0.0
+        return self.tested / self.elapsed
+
+    def timed(self, phase, method):
+        ''' returns a function that calls method and adds the time it took
+            to the input phase
+        '''
+        times = self.times
+        clock = time.perf_counter
+        def wrapper(*args):
+            start = clock()
+            result = method(*args)
+            times[phase] += clock() - start
+            return result
+        return wrapper
+
+    def start(self, searcher):
+        ''' called by Searcher.find_solution when the search of searcher
+            begins
+        '''
+        self.searcher = searcher
+        self.start_time = time.perf_counter()
+        self.last_progress = self.start_time
+        self.tested_before = searcher.num_tested
+        self.pushed += 1 # the initial state
+
+    def count_successors(self, successors, num_pushed, depth_limit):
+        ''' counts the list successors of a tested state, num_pushed of
+            which were added to the frontier. The others were pruned by
+            depth_limit or rejected as repeated boards.
+        '''
+        self.generated += len(successors)
+        self.pushed += num_pushed
+        pruned_depth = 0
+        if depth_limit != -1:
+            for s in successors:
+                if s.num_moves > depth_limit:
+                    pruned_depth += 1
+        self.pruned_depth += pruned_depth
+        self.pruned_cycle += len(successors) - num_pushed - pruned_depth
+
+    def tick(self):
+        ''' called after each state is tested, to call progress every 
+            interval seconds
+        '''
+        if self.progress == None:
+            return
+        now = time.perf_counter()
+        if now - self.last_progress >= self.interval:
+            self.elapsed = now - self.start_time
+            self.tested = self.searcher.num_tested - self.tested_before
+            self.peak_frontier = self.searcher.max_frontier
+            self.progress(self)
+            self.last_progress = time.perf_counter()
+
+    def finish(self, searcher):
+        ''' called by Searcher.find_solution when the search ends
+        '''
+        self.elapsed = time.perf_counter() - self.start_time
+        self.tested = searcher.num_tested - self.tested_before
+        self.peak_frontier = searcher.max_frontier
+
+
+def instrument(searcher, progress=None, interval=1.0):
+    ''' attaches a new SearchStats to searcher, so that its next call to
+        find_solution is measured, and returns the SearchStats. progress and
+        interval are passed to the SearchStats constructor.
+
+        Only the searchers that use the search loop of
+        Searcher.find_solution (random, BFS, DFS, Greedy, A* and weighted
+        A*) can be instrumented; for the others, which run their own 
+        loops, ValueError is raised.
+    '''
+    if not searcher.instrumentable:
+        raise ValueError(type(searcher).__name__ + ' runs its own search '
+                         'loop, which cannot be instrumented')
+    stats = SearchStats(progress, interval)
+    stats.searcher = searcher
+    searcher.stats = stats
+    # filtering and pushing happen inside add_states, so they are timed by
+    # replacing the methods it calls on this searcher only. The priority
+    # is computed inside add_state.
+    searcher.should_add = stats.timed('filter', searcher.should_add)
+    searcher.add_state = stats.timed('push', searcher.add_state)
+    if hasattr(searcher, 'priority'):
+        searcher.priority = stats.timed('priority', searcher.priority)
+    return stats
@@ -0,0 +1,259 @@
+import mmap
+import os
+import struct
+import zlib
+from collections import deque
+from board import *
+
+# Disjoint additive pattern databases for the Eight Puzzle and the larger
+# sliding puzzles (the 15-puzzle on a 4x4 board, and so on).
+#
+# Each pattern is a group of tiles. Its table gives, for every placement of
+# those tiles, the fewest moves *of those tiles* needed to bring them to their
+# goal cells, with the other tiles treated as indistinguishable and the blank
+# free to go anywhere. Because no move is counted by two patterns, the sum of
+# the table entries for disjoint patterns never overestimates the true
+# number of moves.
+#
+# A placement of the tiles of a pattern is indexed as a base-n number, where
+# n is the number of cells, whose i-th digit is the cell of the i-th tile, so
+# each table has n ** len(pattern) one-byte entries (placements that put two
+# tiles on one cell are unused).
+
+# the file format, which is checked when a database is loaded:
+#   header - MAGIC, FORMAT_VERSION, board size, CRC-32 of the rest
+#   then the number of patterns
+#   then for each pattern: its length, its tiles, one byte each
+#   then the tables, one after another
+MAGIC = b'8PDB'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHHI')
+
+# the default partition of the tiles into patterns, by board size. The 4x4
+# groups are kept small so that the tables build in seconds.
+DEFAULT_PATTERNS = {3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+                    4: [(1, 2, 3), (4, 5, 6), (7, 8, 9), (10, 11, 12),
+                        (13, 14, 15)]}
+
+def default_path(size):
+    ''' returns the default location of the database file for size x size
+        boards
+    '''
+    if size == 3:
+        name = 'pattern_db.bin'
+    else:
+        name = 'pattern_db_' + str(size) + '.bin'
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+DEFAULT_PATH = default_path(3)
+
+# marks table entries that have not been reached yet
+UNSEEN = 255
+
+
+class PatternDatabase:
+    """ A class for a set of disjoint pattern database tables. The tables
+        may be bytearrays (when just built) or slices of a memory map (when
+        loaded from a file), which lets many processes share one copy.
+    """
+    def __init__(self, patterns, tables, size=3):
+        """ a constructor for a PatternDatabase object
+            inputs:
+              * patterns - a list of tuples of tiles, with no tile in two
+                patterns and no blank (0)
+              * tables - a list with one table per pattern, indexable by
+                placement index and giving a number of moves
+              * size - the width of the boards it is for
+        """
+        self.patterns = [tuple(p) for p in patterns]
+        self.tables = tables
+        self.size = size
+        puzzle = puzzle_tables(size)
+        self.num_cells = puzzle.num_cells
+        self.bits = puzzle.bits
+        self.mask = puzzle.mask
+        # the value of each cell digit in the placement index of each pattern
+        self.weights = []
+        for pattern in self.patterns:
+            self.weights += [[self.num_cells ** i 
+                              for i in range(len(pattern))]]
+
+    def __repr__(self):
+        s = 'PatternDatabase ' + str(self.size) + 'x' + str(self.size) + ': '
+        s += ', '.join(['-'.join([str(t) for t in p]) for p in self.patterns])
+        return s
+
+    def lookup(self, code):
+        ''' returns the heuristic value of the board whose packed encoding
+            (see Board.encode) is code
+        '''
+        # finds the cell of each tile
+        bits = self.bits
+        mask = self.mask
+        cells = [0] * self.num_cells
+        for p in range(self.num_cells):
+            cells[(code >> (bits * p)) & mask] = p
+        total = 0
+        for i in range(len(self.patterns)):
+            index = 0
+            weights = self.weights[i]
+            pattern = self.patterns[i]
+            for j in range(len(pattern)):
+                index += cells[pattern[j]] * weights[j]
+            total += self.tables[i][index]
+        return total
+
+
+def build_table(pattern, size=3):
+    ''' computes the table for one pattern on size x size boards by a 
+        backward breadth-first search from the goal, in which only moves of 
+        the pattern's tiles cost 1. returns it as a bytearray.
+    '''
+    n = size * size
+    neighbors = puzzle_tables(size).neighbors
+    k = len(pattern)
+    num_placements = n ** k
+    # distances of (placement, blank cell) pairs, stored at placement*n+blank
+    dist = bytearray([UNSEEN]) * (num_placements * n)
+    start = 0
+    for j in range(k):
+        start += pattern[j] * n ** j
+    dist[start * n + 0] = 0
+    # a 0-1 breadth-first search: free moves go on the front of the queue
+    queue = deque([start * n + 0])
+    while len(queue) > 0:
+        node = queue.popleft()
+        d = dist[node]
+        index = node // n
+        blank = node % n
+        cells = []
+        rest = index
+        for j in range(k):
+            cells += [rest % n]
+            rest //= n
+        for q in neighbors[blank]:
+            if q in cells:
+                # the blank swaps with a pattern tile, which costs a move
+                j = cells.index(q)
+                new = (index + (blank - q) * n ** j) * n + q
+                if dist[new] > d + 1:
+                    dist[new] = d + 1
+                    queue.append(new)
+            else:
+                new = index * n + q
+                if dist[new] > d:
+                    dist[new] = d
+                    queue.appendleft(new)
+    table = bytearray([UNSEEN]) * num_placements
+    for node in range(len(dist)):
+        if dist[node] < table[node // n]:
+            table[node // n] = dist[node]
+    return table
+
+
+def build_pattern_db(patterns=None, size=3):
+    ''' builds and returns a PatternDatabase for the input patterns on
+        size x size boards (by default, DEFAULT_PATTERNS[size])
+    '''
+    if patterns == None:
+        patterns = DEFAULT_PATTERNS[size]
+    last = size * size - 1
+    seen = []
+    for pattern in patterns:
+        for t in pattern:
+            if t in seen or t < 1 or t > last:
+                raise ValueError('patterns must be disjoint sets of tiles 1-' +
+                                 str(last))
+            seen += [t]
+    return PatternDatabase(patterns, [build_table(p, size) for p in patterns],
+                           size)
+
+
+def save_pattern_db(db, path=None):
+    ''' writes db to the file at path (by default, default_path(db.size)).
+        The file is written under a temporary name and then renamed, so a
+        reader never sees a partial file.
+    '''
+    body = struct.pack('<H', len(db.patterns))
+    for pattern in db.patterns:
+        body += struct.pack('<B', len(pattern)) + bytes(pattern)
+    for table in db.tables:
+        body += bytes(table)
+    if path == None:
+        path = default_path(db.size)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, db.size, zlib.crc32(body))
+    temp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header + body)
+    os.replace(temp_path, path)
+
+
+def load_pattern_db(path=DEFAULT_PATH):
+    ''' returns the PatternDatabase stored in the file at path. The tables
+        are read through a read-only memory map, so they are paged in on
+        demand and shared between processes. raises ValueError if the file
+        is not a valid database of the current FORMAT_VERSION.
+    '''
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) < HEADER.size:
+        raise ValueError(path + ': not a pattern database')
+    magic, version, size, crc = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(path + ': not a pattern database')
+    if version != FORMAT_VERSION:
+        raise ValueError(path + ': pattern database version ' + str(version) +
+                         ', expected ' + str(FORMAT_VERSION))
+    if size < 2:
+        raise ValueError(path + ': pattern database is corrupt')
+    view = memoryview(buf)
+    if zlib.crc32(view[HEADER.size:]) != crc:
+        raise ValueError(path + ': pattern database is corrupt')
+    pos = HEADER.size
+    num_patterns = struct.unpack_from('<H', buf, pos)[0]
+    pos += 2
+    patterns = []
+    for i in range(num_patterns):
+        k = buf[pos]
+        patterns += [tuple(buf[pos + 1:pos + 1 + k])]
+        pos += 1 + k
+    tables = []
+    for pattern in patterns:
+        length = (size * size) ** len(pattern)
+        tables += [view[pos:pos + length]]
+        pos += length
+    if pos != len(buf):
+        raise ValueError(path + ': pattern database is corrupt')
+    return PatternDatabase(patterns, tables, size)
+
+
+# the databases used by default_pattern_db(), by size, once they are loaded
+_default_db = {}
+
+def default_pattern_db(size=3, path=None):
+    ''' returns the PatternDatabase for DEFAULT_PATTERNS[size], loading it
+        from path (by default, default_path(size)) the first time it is 
+        needed. If the file is missing, out of date or invalid, the database
+        is built and saved there first.
+    '''
+    db = _default_db.get(size)
+    if db == None:
+        if size not in DEFAULT_PATTERNS:
+            raise ValueError('no default pattern database for ' + str(size) +
+                             'x' + str(size) + ' boards')
+        if path == None:
+            path = default_path(size)
+        patterns = DEFAULT_PATTERNS[size]
+        try:
+            db = load_pattern_db(path)
+            if (db.size != size or 
+                db.patterns != [tuple(p) for p in patterns]):
+                raise ValueError(path + ': different patterns')
+        except (OSError, ValueError):
+            db = build_pattern_db(patterns, size)
+            try:
+                save_pattern_db(db, path)
+            except OSError:
+                pass # the database can still be used from memory
+        _default_db[size] = db
+    return db
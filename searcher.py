@@ -1,4 +1,9 @@
-import random
+import time
+import pattern_db
+import solution_table
+from budget import *
+from frontier import *
+from instrument import *
 from state import *
 from board import *
 
@@ -6,14 +11,41 @@ class Searcher:
     """ A class for objects that perform random state-space
         search on an Eight Puzzle.
     """
+    # the kind of container used for the untested states
+    frontier_class = RandomFrontier
+    # True for the searchers that return their best solution so far when
+    # their budget runs out, rather than None
+    anytime = False
+    # the board widths the searcher can solve, or None for any width
+    sizes = None
+    # False for the searchers that run their own search loop, which 
+    # instrument() cannot measure
+    instrumentable = True
   
-    def __init__(self,depth_limit):
+    def __init__(self,depth_limit,closed_set=False):
         '''constructs a new Searcher object by initializing 3 attributes: 
            states, num_tested, and depth_limits
+           closed_set is an optional parameter. When True, cycles are
+           detected with a hashed table of every board seen so far instead
+           of walking the predecessor chain of each new state.
         '''
-        self.states = [] # creates an empty list
+        self.states = self.frontier_class() # creates an empty frontier
         self.num_tested  = 0 # number tested starts at 0
         self.depth_limit = depth_limit # initializing depth_limit
+        # set by find_solution when the initial board cannot be solved
+        self.unsolvable = False
+        # maps the key() of each board seen to the fewest moves
+        # it has been reached in, or None for the path-only cycle check
+        if closed_set:
+            self.closed = {}
+        else:
+            self.closed = None
+        # a SearchStats when the search is instrumented (see instrument.py)
+        self.stats = None
+        # the Budget of the current search, and a BudgetExceeded record if
+        # it ran out (see budget.py)
+        self.budget = None
+        self.exceeded = None
 
   
     def __repr__(self):
@@ -29,6 +61,24 @@ class Searcher:
             s += 'depth limit = ' + str(self.depth_limit)
         return s
     
+    @property
+    def num_pushed(self):
+        '''the number of states added to the untested states so far
+        '''
+        return self.states.num_pushed
+    
+    @property
+    def num_popped(self):
+        '''the number of states taken from the untested states so far
+        '''
+        return self.states.num_popped
+    
+    @property
+    def max_frontier(self):
+        '''the most untested states held at once so far
+        '''
+        return self.states.max_len
+    
     def should_add(self,state):
         '''takes a State object called state and returns True if the called 
            Searcher should add state to its list of untested states, and False
@@ -38,6 +88,14 @@ class Searcher:
         # cases in which searcher should not continue
         if self.depth_limit != -1 and state.num_moves > self.depth_limit:
             return False
+        if self.closed != None:
+            # only (re)open a board when it is reached in fewer moves
+            key = state.key()
+            best = self.closed.get(key)
+            if best != None and best <= state.num_moves:
+                return False
+            self.closed[key] = state.num_moves
+            return True
         if state.creates_cycle():
             return False
         else: 
@@ -47,7 +105,7 @@ class Searcher:
         ''' takes a single State object called new_state and adds it to the 
             Searcher‘s list of untested states. 
         '''
-        self.states += [new_state] # adds new_state to self
+        self.states.push(new_state) # adds new_state to self
    
    
     def add_states(self,new_states):
@@ -64,53 +122,174 @@ class Searcher:
         """ chooses the next state to be tested from the list of 
         untested states, then removes it from the list and returns
         """ 
-        s = random.choice(self.states) # chooses a random state  
-        self.states.remove(s) # removes that state
-        return s
+        # the frontier decides which state comes next, a random one unless
+        # a subclass uses a different frontier_class
+        return self.states.pop()
+    
+    def is_stale(self,state):
+        '''returns True if state's board has since been reached in fewer 
+           moves, in which case there is no point in testing state
+        '''
+        if self.closed == None:
+            return False
+        return self.closed.get(state.key()) < state.num_moves
+    
+    def check_solvable(self,init_state):
+        '''returns True if the goal can be reached from init_state. If not,
+           sets self.unsolvable so callers can tell this case apart from
+           a search that failed.
+        '''
+        self.unsolvable = not init_state.board.is_solvable()
+        return not self.unsolvable
+    
+    def start_budget(self,budget,init_state):
+        '''prepares to check budget (a Budget, or None for no limits) 
+           during a search from init_state
+        '''
+        self.budget = budget
+        self.exceeded = None
+        self.best = None # the state with the lowest heuristic value so far
+        self.best_h = None
+        self.budget_start = time.perf_counter()
+        self.deadline = None
+        if budget != None and budget.time_limit != None:
+            self.deadline = self.budget_start + budget.time_limit
+        self.node_bytes = bytes_per_node(init_state)
+    
+    def frontier_size(self):
+        '''returns the number of untested states held
+        '''
+        return len(self.states)
+    
+    def num_held(self):
+        '''returns the number of states that may still be in memory, used
+           to estimate the memory of the search. Every state pushed stays 
+           reachable, from the frontier or as a predecessor.
+        '''
+        return self.num_pushed
+    
+    def budget_reason(self):
+        '''returns the name of the part of self.budget that has run out, 
+           or None if none has
+        '''
+        budget = self.budget
+        if budget.token != None and budget.token.is_set():
+            return 'cancelled'
+        if budget.max_nodes != None and self.num_tested >= budget.max_nodes:
+            return 'nodes'
+        if budget.max_frontier != None and \
+           self.frontier_size() > budget.max_frontier:
+            return 'frontier'
+        if budget.max_memory != None and \
+           self.num_held() * self.node_bytes > budget.max_memory:
+            return 'memory'
+        if self.deadline != None and time.perf_counter() >= self.deadline:
+            return 'time'
+        return None
+    
+    def note_best(self,state):
+        '''remembers state if its heuristic value is the lowest so far. The
+           value is the one the searcher computed, or h2 for the searchers
+           that do not use a heuristic.
+        '''
+        h = state.h
+        if h == None:
+            h = h2(state)
+        if self.best_h == None or h < self.best_h:
+            self.best = state
+            self.best_h = h
+    
+    def over_budget(self,state):
+        '''called with each state about to be tested. returns True, and 
+           sets self.exceeded, if the budget has run out.
+        '''
+        self.note_best(state)
+        reason = self.budget_reason()
+        if reason == None:
+            return False
+        self.exceeded = BudgetExceeded(reason, self.best, self.best_h,
+                                       self.num_tested, 
+                                       time.perf_counter() - 
+                                       self.budget_start)
+        return True
   
-    def find_solution(self,init_state):
+    def find_solution(self,init_state,budget=None):
         '''performs random state-space search, and stops when the goal
            state is found or when the Searcher runs out of untested states.
+           returns None straight away if init_state is not solvable.
            input:
                init_state is a parameter added to the untested states
+               budget is an optional Budget; if it runs out the search 
+               stops, returns None and sets self.exceeded
         '''    
+        if not self.check_solvable(init_state):
+            return None
+        self.start_budget(budget, init_state)
+        if self.closed != None:
+            self.closed[init_state.key()] = init_state.num_moves
+        stats = self.stats
+        if stats != None:
+            # each phase of the loop is timed and counted (see 
+            # instrument.py); filter, push and priority are timed by 
+            # instrument() wrapping should_add, add_state and priority
+            clock = time.perf_counter
+            times = stats.times
+            stats.start(self)
         self.add_state(init_state) # adds init_state parameter
-        # loops while there are more states to go through
-        while len(self.states) > 0:
-            s = self.next_state()
-            if s.is_goal() == True:
+        try:
+            # loops while there are more states to go through
+            while len(self.states) > 0:
+                if stats != None:
+                    t0 = clock()
+                s = self.next_state()
+                if stats != None:
+                    t1 = clock()
+                    times['pop'] += t1 - t0
+                if self.is_stale(s):
+                    if stats != None:
+                        stats.stale += 1
+                    continue
+                if budget != None and self.over_budget(s):
+                    return None
                 self.num_tested += 1
-                return s
-            else:
+                if s.is_goal() == True:
+                    return s
                 # continues to find successors
-                self.num_tested += 1
-                self.add_states(s.generate_successors())
-            
-        return None # failure
+                if stats != None:
+                    t2 = clock()
+                    times['goal'] += t2 - t1
+                successors = s.generate_successors()
+                if stats != None:
+                    times['successors'] += clock() - t2
+                    num_pushed = self.num_pushed
+                self.add_states(successors)
+                if stats != None:
+                    stats.count_successors(successors, 
+                                           self.num_pushed - num_pushed,
+                                           self.depth_limit)
+                    stats.tick()
+                
+            return None # failure
+        finally:
+            if stats != None:
+                stats.finish(self)
                 
 class BFSearcher(Searcher):
     '''A class that inherits from Searcher and uses first in first out to 
        solve the puzzle
     '''
-    def next_state(self):
-        '''Follows FIFO ordering, chooses the state that has been in the list 
-           the longest
-        '''
-        s = self.states[0] # takes from the first state
-        self.states.remove(s) # removes this state
-        return s
+    # Follows FIFO ordering, chooses the state that has been in the list 
+    # the longest
+    frontier_class = FIFOFrontier
 
 class DFSearcher(Searcher):
     ''' A class that inherits from Searcher and uses last in last out to 
         solve the puzzle
      '''
-    def next_state(self):
-        '''follows LIFO ordering, chooses the state that was most recently 
-           called
-         '''
-        s = self.states[-1] # takes from the last state
-        self.states.remove(s) # removes this state
-        return s
+    # follows LIFO ordering, chooses the state that was most recently 
+    # added
+    frontier_class = LIFOFrontier
+
 # heuristic functions
 def h0(state):
     """ a heuristic function that always returns 0 """
@@ -125,44 +304,117 @@ def h2(state):
     
     return state.board.num_misplaced_2()
 
+# h1 and h2 are sums over the cells of a per-tile, per-cell cost, so the 
+# value of a successor can be found from its parent's by looking at the one
+# tile that moved. cost_table names the PuzzleTables attribute holding that
+# cost, where table[t][p] is the cost of tile t at cell p.
+h1.cost_table = 'misplaced'
+h2.cost_table = 'manhattan'
+
+def heuristic_cost_table(heuristic, size):
+    '''returns the cost table of heuristic for size x size boards, or None
+       if its value cannot be updated incrementally
+    '''
+    name = getattr(heuristic, 'cost_table', None)
+    if name == None:
+        return None
+    return getattr(puzzle_tables(size), name)
+
+def move_delta(table, tile, old_cell, new_cell):
+    '''returns the change in a cost_table heuristic when tile moves from
+       old_cell to new_cell and the blank moves the other way
+    '''
+    return (table[tile][new_cell] - table[tile][old_cell] + 
+            table[0][old_cell] - table[0][new_cell])
+
+def h3(state):
+    '''sum of the moves needed by each group of tiles in the default
+       disjoint pattern database (see pattern_db.py), which is loaded 
+       from disk, or built, the first time it is needed
+    '''
+    return pattern_db.default_pattern_db(state.size).lookup(state.key())
+
+def h4(state):
+    '''Manhattan distance of the tiles plus two moves for each tile that 
+       has to step out of its goal row or column to let another one past
+    '''
+    return state.board.linear_conflict()
+
+# the heuristics by name
+HEURISTICS = {'h0': h0, 'h1': h1, 'h2': h2, 'h3': h3, 'h4': h4}
+
 class GreedySearcher(Searcher):
     """ A class for objects that perform an informed greedy state-space
         search on an Eight Puzzle.
     """
+    # a binary heap that pops the highest priority first
+    frontier_class = PriorityFrontier
   
-    def __init__(self, depth_limit, heuristic):
+    def __init__(self, depth_limit, heuristic, closed_set=False,
+                 check_incremental=False):
         """ constructor for a GreedySearcher object
         inputs:
          * depth_limit - the depth limit of the searcher
          * heuristic - a reference to the function to be used when computing 
          the priority of a state
+         * closed_set - an optional parameter that selects the hashed 
+         closed-set cycle check (see Searcher)
+         * check_incremental - an optional parameter; when True, every 
+         incrementally updated heuristic value is checked against a full
+         call to the heuristic
         """
 
-        Searcher.__init__(self,depth_limit)
+        Searcher.__init__(self,depth_limit,closed_set)
         self.heuristic = heuristic
+        self.check_incremental = check_incremental
+        # the heuristic's cost table for the board size being solved
+        self.cost_table = None
+        
+    def find_solution(self,init_state,budget=None):
+        '''looks up the heuristic's cost table for the size of init_state's
+           board, then searches as Searcher.find_solution does
+        '''
+        self.cost_table = heuristic_cost_table(self.heuristic, 
+                                               init_state.size)
+        return Searcher.find_solution(self,init_state,budget)
+        
+    def heuristic_value(self,state):
+        ''' returns the heuristic value of state and stores it in state.h.
+            If the heuristic has a cost_table and the predecessor's value 
+            is known, the value is updated from the predecessor's instead of
+            being computed from scratch.
+        '''
+        parent = state.predecessor
+        if state.h != None and parent != None:
+            # already computed (by ARAStarSearcher.should_add); an initial
+            # state is always evaluated again, as it may have come from 
+            # another search
+            return state.h
+        table = self.cost_table
+        if table == None or parent == None or parent.h == None:
+            state.h = self.heuristic(state)
+            return state.h
+        # the tile that moved is now where the blank used to be
+        old_blank = parent.blank_cell()
+        new_blank = state.blank_cell()
+        tile = state.tile_at(old_blank)
+        state.h = parent.h + move_delta(table, tile, new_blank, old_blank)
+        if self.check_incremental:
+            assert state.h == self.heuristic(state), 'incremental heuristic'
+        return state.h
         
     def priority(self,state):
         ''' takes a State object called state, and that computes and
             returns the priority of that state.
         '''
-        return -1 * self.heuristic(state)
+        return -1 * self.heuristic_value(state)
     
     def add_state(self,state):
-        '''Overrides the add_state method from Searcher. Adds a sublist in
-          [priority, state] form, where priority is the priority of the
-           state, determined by calling the priority method.
+        '''Overrides the add_state method from Searcher. Pushes state onto
+           the priority frontier with the priority determined by calling the
+           priority method.
          '''
-        self.states += [[self.priority(state),state]]
-        
-    def next_state(self):
-        '''overrides the next_state method that is
-           inherited from Searcher.
-         '''
-        # finds the sublist with highest priority
-        s = max(self.states)
-        # removes this sublist from the rest
-        self.states.remove(s)
-        return s[1]
+        self.states.push(state, self.priority(state))
 
     def __repr__(self):
         """ returns a string representation of the GreedySearcher object
@@ -171,7 +423,9 @@ class GreedySearcher(Searcher):
         s = type(self).__name__ + ': '
         s += str(len(self.states)) + ' untested, '
         s += str(self.num_tested) + ' tested, '
-        s += 'heuristic ' + self.heuristic.__name__
+        s += 'heuristic ' + self.heuristic.__name__ + ', '
+        s += str(self.num_pushed) + ' pushed, '
+        s += str(self.num_popped) + ' popped'
         return s
 
 class AStarSearcher(GreedySearcher):
@@ -182,4 +436,501 @@ class AStarSearcher(GreedySearcher):
         '''assigns the priority based on a heuristic function, but also
            accounts for the amount of moves it takes
         '''
-        return -1 * (self.heuristic(state) + state.num_moves)
\ No newline at end of file
+        return -1 * (self.heuristic_value(state) + state.num_moves)
+
+# the default weights of WeightedAStarSearcher and, for its first search,
+# of ARAStarSearcher
+DEFAULT_WEIGHT = 2.0
+ARA_WEIGHT = 3.0
+
+class WeightedAStarSearcher(AStarSearcher):
+    '''A class that solves the puzzle with weighted A*, which multiplies the
+       heuristic value by a weight of at least 1 to reach a goal after 
+       testing fewer states. With an admissible heuristic (h0, h1, h3 or 
+       h4, but not h2, which also counts the blank) the solution found is at
+       most weight times as long as an optimal one. A weight of 1 is A*.
+    '''
+    
+    def __init__(self, depth_limit, heuristic, weight=DEFAULT_WEIGHT,
+                 closed_set=False, check_incremental=False):
+        '''constructs a WeightedAStarSearcher; weight is the factor applied 
+           to the heuristic, and the other inputs are those of 
+           GreedySearcher
+        '''
+        assert weight >= 1, 'the weight must be at least 1'
+        GreedySearcher.__init__(self, depth_limit, heuristic, closed_set,
+                                check_incremental)
+        self.weight = weight
+    
+    def priority(self,state):
+        '''assigns the priority from the number of moves plus the weighted
+           heuristic value
+        '''
+        return -1 * (self.weight * self.heuristic_value(state) + 
+                     state.num_moves)
+    
+    def __repr__(self):
+        """ returns a string representation of the WeightedAStarSearcher
+            object referred to by self.
+        """
+        return GreedySearcher.__repr__(self) + ', weight ' + str(self.weight)
+
+class ARAStarSearcher(WeightedAStarSearcher):
+    '''A class that solves the puzzle with anytime repairing A* (ARA*). It
+       finds a first solution quickly with a high weight, then lowers the 
+       weight by step and searches again, until the weight reaches 1 (and
+       the solution is optimal) or the budget runs out. Each search reuses
+       the states of the previous one: the untested states are given their
+       new priorities, and states whose boards were reached in fewer moves
+       after being tested are tested again. States that cannot lead to a 
+       shorter solution than the best so far are dropped.
+       
+       Each solution is at most its search's weight times as long as an 
+       optimal one when the heuristic is consistent (h0, h1 or h3).
+    '''
+    # keeps the best solution found when its budget runs out
+    anytime = True
+    instrumentable = False
+    
+    def __init__(self, depth_limit, heuristic, weight=ARA_WEIGHT, step=0.5,
+                 improved=None):
+        '''constructs an ARAStarSearcher
+           inputs:
+            * depth_limit, heuristic - as for GreedySearcher
+            * weight - the weight of the first search
+            * step - the amount the weight is lowered by for each search
+            * improved - an optional function called as improved(state, 
+              weight) with the goal state of each shorter solution found,
+              and the weight of the search that found it
+        '''
+        assert step > 0, 'the step must be positive'
+        WeightedAStarSearcher.__init__(self, depth_limit, heuristic, weight,
+                                       True)
+        self.initial_weight = weight
+        self.step = step
+        self.improved = improved
+        # the goal state of the shortest solution so far
+        self.incumbent = None
+        # one (num_moves, weight, num_tested, elapsed) tuple per solution
+        self.solutions = []
+        # the weight of the last search that finished, which bounds the 
+        # incumbent's length, or None if no search has finished
+        self.bound = None
+        self.tested_keys = set() # the boards tested in the current search
+        self.inconsistent = [] # states to test again in the next search
+    
+    def should_add(self,state):
+        '''returns True if state should be added to the untested states, as
+           Searcher.should_add does, except that states that cannot lead to
+           a shorter solution are dropped, and a board already tested in 
+           this search is kept for the next one instead
+        '''
+        if not Searcher.should_add(self,state):
+            return False
+        incumbent = self.incumbent
+        if incumbent != None and state.num_moves + \
+           self.heuristic_value(state) >= incumbent.num_moves:
+            return False
+        if state.key() in self.tested_keys:
+            self.inconsistent += [state]
+            return False
+        return True
+    
+    def search(self,budget):
+        '''runs one weighted A* search with the current weight, starting 
+           from the untested states. returns the goal state reached, or 
+           None if the untested states run out or the budget does.
+        '''
+        while len(self.states) > 0:
+            s = self.next_state()
+            if self.is_stale(s):
+                continue
+            incumbent = self.incumbent
+            if incumbent != None and s.num_moves + s.h >= incumbent.num_moves:
+                continue
+            if budget != None and self.over_budget(s):
+                return None
+            self.num_tested += 1
+            if s.is_goal():
+                return s
+            self.tested_keys.add(s.key())
+            self.add_states(s.generate_successors())
+        return None
+    
+    def find_solution(self,init_state,budget=None):
+        '''performs a series of searches with lower and lower weights, and
+           returns the goal state of the shortest solution found. If the 
+           budget (see Searcher.find_solution) runs out, the search stops 
+           and sets self.exceeded, but the best solution so far is still 
+           returned; a budget time_limit is the usual way to bound it.
+        '''
+        if not self.check_solvable(init_state):
+            return None
+        self.cost_table = heuristic_cost_table(self.heuristic,
+                                               init_state.size)
+        self.start_budget(budget, init_state)
+        self.incumbent = None
+        self.solutions = []
+        self.bound = None
+        self.weight = self.initial_weight
+        self.closed = {init_state.key(): init_state.num_moves}
+        self.add_state(init_state)
+        while True:
+            self.tested_keys = set()
+            self.inconsistent = []
+            goal = self.search(budget)
+            if self.exceeded != None:
+                break
+            if goal != None:
+                self.incumbent = goal
+                self.solutions += [(goal.num_moves, self.weight, 
+                                    self.num_tested, 
+                                    time.perf_counter() - self.budget_start)]
+                if self.improved != None:
+                    self.improved(goal, self.weight)
+            self.bound = self.weight
+            if self.weight == 1 or (len(self.states) == 0 and 
+                                    len(self.inconsistent) == 0):
+                # nothing left that could lead to a shorter solution
+                self.bound = 1
+                break
+            self.weight = max(1, self.weight - self.step)
+            # the untested states get their priorities for the new weight
+            for s in self.states.take_all() + self.inconsistent:
+                if not self.is_stale(s):
+                    self.add_state(s)
+        return self.incumbent
+
+class IDAStarSearcher(Searcher):
+    '''A class that uses iterative-deepening A* to solve the puzzle. Each
+       iteration is a depth-first search that cuts off states whose
+       num_moves + heuristic exceeds a bound, and the next bound is the
+       smallest value that was cut off. Only the current path is kept in
+       memory, and the board is moved in place rather than copied.
+    '''
+    instrumentable = False
+    
+    def __init__(self, depth_limit, heuristic, check_incremental=False):
+        """ constructor for an IDAStarSearcher object
+        inputs:
+         * depth_limit - the depth limit of the searcher
+         * heuristic - a reference to the function to be used when computing 
+         the priority of a state
+         * check_incremental - see GreedySearcher
+        """
+        Searcher.__init__(self,depth_limit)
+        self.heuristic = heuristic
+        self.check_incremental = check_incremental
+        self.bound = 0 # the f bound of the current iteration
+        self.num_iterations = 0 # number of iterations started
+        
+    @property
+    def max_frontier(self):
+        '''None, since only the current path is kept
+        '''
+        return None
+        
+    def __repr__(self):
+        """ returns a string representation of the IDAStarSearcher object
+            referred to by self.
+        """
+        s = type(self).__name__ + ': '
+        s += str(self.num_tested) + ' tested, '
+        s += 'heuristic ' + self.heuristic.__name__ + ', '
+        s += str(self.num_iterations) + ' iterations, '
+        s += 'bound = ' + str(self.bound)
+        return s
+    
+    def frontier_size(self):
+        '''returns 0, since IDA* keeps no untested states
+        '''
+        return 0
+    
+    def num_held(self):
+        '''returns the number of moves on the current path
+        '''
+        return len(self.path)
+    
+    def note_best(self,state):
+        '''remembers the path to the probe, state, if its heuristic value is
+           the lowest so far. The probe itself is moved in place, so the 
+           best state is only built from the path when the budget runs out.
+        '''
+        if self.best_h == None or state.h < self.best_h:
+            self.best_h = state.h
+            self.best_path = list(self.path)
+        
+    def find_solution(self,init_state,budget=None):
+        '''performs iterative-deepening A* search from init_state, and
+           returns the goal State, or None if there is no solution within
+           the depth limit or budget or the board is not solvable. Without 
+           the solvability check, an unsolvable board would never finish.
+        '''
+        if not self.check_solvable(init_state):
+            return None
+        self.start_budget(budget, init_state)
+        self.best_path = []
+        # a single State whose board is moved in place during the search; 
+        # the heuristic is always called on it
+        self.probe = State(packed_board(init_state.board.digit_string()),
+                           None, 'init')
+        self.path = [] # the moves from init_state to the probe
+        self.cost_table = heuristic_cost_table(self.heuristic, 
+                                               self.probe.size)
+        h = self.heuristic(self.probe)
+        self.bound = h
+        try:
+            while True:
+                self.num_iterations += 1
+                t = self.bounded_search(0, -1, h)
+                if t == None:
+                    return self.replay(init_state, self.path)
+                if t == float('inf'):
+                    return None # failure
+                self.bound = t
+        except BudgetStop:
+            best = self.replay(init_state, self.best_path)
+            self.exceeded = self.exceeded._replace(best_state=best)
+            return None
+    
+    def replay(self,init_state,path):
+        '''returns the last of the chain of states made by applying the 
+           moves in path to init_state
+        '''
+        s = init_state
+        for m in path:
+            s = State(s.board.successor(m), s, m)
+        return s
+    
+    def bounded_search(self,num_moves,last,h):
+        '''searches below the probe, which is num_moves moves from the
+           initial state, was reached with move index last (-1 for none) and
+           has heuristic value h. returns None if the goal was found, and 
+           otherwise the smallest f value that exceeded the bound.
+        '''
+        f = num_moves + h
+        if f > self.bound:
+            return f
+        if self.budget != None:
+            self.probe.h = h
+            if self.over_budget(self.probe):
+                raise BudgetStop()
+        self.num_tested += 1
+        board = self.probe.board
+        if board.is_goal():
+            return None
+        if self.depth_limit != -1 and num_moves >= self.depth_limit:
+            return float('inf')
+        table = self.cost_table
+        smallest = float('inf')
+        for d in range(4):
+            # skips the move that would undo the previous one
+            if last != -1 and d == OPPOSITE[last]:
+                continue
+            m = DIRECTIONS[d]
+            old_blank = board.blank
+            if board.move_blank(m):
+                # updates h by the change for the one tile that moved, 
+                # when the heuristic allows it
+                if table != None:
+                    tile = board.tile_at(old_blank)
+                    new_h = h + move_delta(table, tile, board.blank, 
+                                           old_blank)
+                    if self.check_incremental:
+                        assert new_h == self.heuristic(self.probe), \
+                               'incremental heuristic'
+                else:
+                    new_h = self.heuristic(self.probe)
+                self.path += [m]
+                t = self.bounded_search(num_moves + 1, d, new_h)
+                if t == None:
+                    return None
+                self.path.pop()
+                board.move_blank(DIRECTIONS[OPPOSITE[d]])
+                if t < smallest:
+                    smallest = t
+        return smallest
+
+class BidirectionalSearcher(Searcher):
+    '''A class that solves the puzzle with two breadth-first searches at
+       once, one forward from the initial state and one backward from the
+       goal. Whole levels are expanded at a time, always on the side with
+       the smaller frontier, until a board is reached from both sides. The
+       solution found has the fewest possible moves, and each side only 
+       needs to search about half as deep as BFSearcher would.
+    '''
+    instrumentable = False
+    
+    def __init__(self, depth_limit):
+        '''constructor for a BidirectionalSearcher object
+        '''
+        Searcher.__init__(self,depth_limit)
+        self.num_tested_forward = 0 # states expanded from the initial state
+        self.num_tested_backward = 0 # states expanded from the goal
+        self.max_level = 0 # the most nodes in the two frontiers at once
+        
+    @property
+    def max_frontier(self):
+        '''the most nodes held in the two frontiers at once so far
+        '''
+        return self.max_level
+    
+    def frontier_size(self):
+        '''returns the number of nodes in the two frontiers when the 
+           current level was started
+        '''
+        return self.level_size
+    
+    def num_held(self):
+        '''returns the number of nodes reached from either end
+        '''
+        return len(self.seen[0]) + len(self.seen[1])
+        
+    def __repr__(self):
+        """ returns a string representation of the BidirectionalSearcher
+            object referred to by self.
+        """
+        s = type(self).__name__ + ': '
+        s += str(self.num_tested) + ' tested ('
+        s += str(self.num_tested_forward) + ' forward, '
+        s += str(self.num_tested_backward) + ' backward), '
+        if self.depth_limit == -1:
+            s += 'no depth limit'
+        else:
+            s += 'depth limit = ' + str(self.depth_limit)
+        return s
+    
+    def find_solution(self,init_state,budget=None):
+        '''searches from both ends and returns the goal State at the end of
+           a shortest chain of states from init_state, or None if there is 
+           no solution within the depth limit or budget or the board is not
+           solvable. When the budget runs out, the best state is the node 
+           of the forward frontier with the lowest h2.
+        '''
+        if not self.check_solvable(init_state):
+            return None
+        self.start_budget(budget, init_state)
+        # both searches use Nodes; their keys are the same packed encoding
+        # that State.key() gives
+        start = lean_state(init_state.board.digit_string())
+        goal = lean_state(goal_string(start.size))
+        forward = [start] # the frontier of each search
+        backward = [goal]
+        seen_forward = {start.key(): start} # every node reached, by key
+        seen_backward = {goal.key(): goal}
+        self.seen = (seen_forward, seen_backward)
+        depth = 0 # the combined depth of the two searches
+        meeting = None
+        if start.key() == goal.key():
+            meeting = (start, goal)
+        while meeting == None and len(forward) > 0 and len(backward) > 0:
+            if self.depth_limit != -1 and depth >= self.depth_limit:
+                return None
+            self.level_size = len(forward) + len(backward)
+            try:
+                if len(forward) <= len(backward):
+                    forward, meeting = self.expand_level(forward, 
+                                                         seen_forward,
+                                                         seen_backward)
+                    self.num_tested_forward += self.expanded
+                else:
+                    backward, meeting = self.expand_level(backward, 
+                                                          seen_backward,
+                                                          seen_forward)
+                    if meeting != None:
+                        meeting = (meeting[1], meeting[0])
+                    self.num_tested_backward += self.expanded
+            except BudgetStop as e:
+                for node in forward:
+                    self.note_best(node)
+                self.exceeded = BudgetExceeded(e.args[0], self.best,
+                                               self.best_h, self.num_tested,
+                                               time.perf_counter() - 
+                                               self.budget_start)
+                return None
+            if len(forward) + len(backward) > self.max_level:
+                self.max_level = len(forward) + len(backward)
+            depth += 1
+        if meeting == None:
+            return None # failure
+        
+        # the moves to the meeting point, followed by the backward chain's
+        # moves undone in reverse order
+        moves = []
+        node = meeting[0]
+        while node.parent != None:
+            moves += [node.move_code]
+            node = node.parent
+        moves.reverse()
+        node = meeting[1]
+        while node.parent != None:
+            moves += [OPPOSITE[node.move_code]]
+            node = node.parent
+        s = init_state
+        for d in moves:
+            m = DIRECTIONS[d]
+            s = State(s.board.successor(m), s, m)
+        return s
+    
+    def expand_level(self,frontier,seen,other_seen):
+        '''expands every node in frontier, adding new nodes to seen. returns
+           the next frontier and either None or, for the meeting with the 
+           fewest total moves, a pair (node on this side, node on the other
+           side) with the same board. Sets self.expanded to the number of
+           nodes expanded. raises BudgetStop if the budget runs out.
+        '''
+        new_frontier = []
+        meeting = None
+        best = -1
+        self.expanded = 0
+        for node in frontier:
+            if self.budget != None:
+                reason = self.budget_reason()
+                if reason != None:
+                    raise BudgetStop(reason)
+            self.expanded += 1
+            self.num_tested += 1
+            for child in node.generate_successors():
+                key = child.key()
+                if key in seen:
+                    continue
+                seen[key] = child
+                new_frontier += [child]
+                other = other_seen.get(key)
+                if other != None and (best == -1 or other.depth < best):
+                    meeting = (child, other)
+                    best = other.depth
+        return new_frontier, meeting
+
+class TableSearcher(Searcher):
+    '''A class that solves the puzzle by looking up each move of an optimal
+       solution in the precomputed table of solution_table.py, which is
+       loaded (or built) the first time it is needed
+    '''
+    sizes = [3]
+    instrumentable = False
+    
+    def find_solution(self,init_state,budget=None):
+        '''returns the goal State at the end of a shortest chain of states
+           from init_state, or None if the board is not solvable or the
+           solution is longer than the depth limit. num_tested counts the
+           table lookups. A solution takes one lookup per move, so budget
+           is accepted for consistency but never runs out.
+        '''
+        if not self.check_solvable(init_state):
+            return None
+        self.start_budget(budget, init_state)
+        if init_state.size != 3:
+            raise ValueError('the solution table only covers 3x3 boards')
+        table = solution_table.default_solution_table()
+        s = init_state
+        while True:
+            entry = table[permutation_rank(s.key())]
+            self.num_tested += 1
+            if entry == 0:
+                return s
+            if self.depth_limit != -1 and s.num_moves + (entry >> 2) > \
+               self.depth_limit:
+                return None # failure
+            m = DIRECTIONS[entry & 3]
+            s = State(s.board.successor(m), s, m)
@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import json
+import sys
+from eight_puzzle import *
+
+# An asyncio interface to the solvers, for embedding in a service.
+#
+# SolverService.solve is a coroutine that hands the search to a pool of
+# worker processes, so the event loop is never blocked. Requests for the
+# same (board, algorithm, heuristic, depth_limit) that arrive while one is
+# being solved wait for that search instead of starting another, and
+# finished results are kept in a size-bounded LRU cache.
+#
+# serve_jsonl is a small front end that reads one JSON request per line
+# and writes one JSON result per line, e.g.
+#   echo '{"id": 1, "board": "142358607", "heuristic": "h2"}' | \
+#       python service.py
+
+# the statuses whose results are the same every time, so can be cached.
+# The others depend on timing or on the search being interrupted.
+CACHEABLE = ['solved', 'unsolvable', 'no solution', 'invalid board']
+
+
+class SolverService:
+    """ A class for objects that solve boards asynchronously in a pool of
+        worker processes, with merging of identical concurrent requests and
+        an LRU cache of results.
+    """
+
+    def __init__(self, workers=None, cache_size=1024, closed_set=True,
+                 packed=False, lean=False, time_limit=None, budget=None):
+        """ a constructor for a SolverService object
+            inputs:
+              * workers - the number of worker processes (by default, one
+                per CPU)
+              * cache_size - the most results kept in the cache; 0 turns
+                the cache off
+              * closed_set, packed, lean, time_limit, budget - options used
+                for every search (see solve_one)
+        """
+        self.pool = concurrent.futures.ProcessPoolExecutor(workers)
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict() # least recently used first
+        self.in_flight = {} # the future of each search running, by key
+        self.options = {'closed_set': closed_set, 'packed': packed,
+                        'lean': lean, 'time_limit': time_limit,
+                        'budget': budget}
+        self.hits = 0 # requests answered from the cache
+        self.merged = 0 # requests that waited for an identical search
+        self.searches = 0 # searches started
+
+    def __repr__(self):
+        """ returns a string representation of the SolverService object
+            referred to by self.
+        """
+        s = 'SolverService: ' + str(self.searches) + ' searches, '
+        s += str(self.hits) + ' cache hits, '
+        s += str(self.merged) + ' merged, '
+        s += str(len(self.in_flight)) + ' in flight, '
+        s += str(len(self.cache)) + '/' + str(self.cache_size) + ' cached'
+        return s
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        ''' shuts down the worker processes
+        '''
+        self.pool.shutdown(cancel_futures=True)
+
+    def check_request(self, boardstr, algorithm='A*', heuristic=None,
+                      depth_limit=-1):
+        ''' returns (key, heuristic) for a request to solve: the key it is
+            cached and merged under, and the heuristic function to use,
+            which is h4 for the algorithms in INFORMED when heuristic is
+            None. raises ValueError for an unknown algorithm or heuristic,
+            or a depth_limit that is not an integer.
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError('unknown algorithm: ' + str(algorithm))
+        if isinstance(heuristic, str):
+            if heuristic not in HEURISTICS:
+                raise ValueError('unknown heuristic: ' + heuristic)
+            heuristic = HEURISTICS[heuristic]
+        elif heuristic == None and algorithm in INFORMED:
+            heuristic = h4
+        elif heuristic != None and not callable(heuristic):
+            raise ValueError('unknown heuristic: ' + str(heuristic))
+        if not isinstance(depth_limit, int) or isinstance(depth_limit, bool):
+            raise ValueError('depth_limit must be an integer')
+        hname = None
+        if heuristic != None:
+            hname = heuristic.__name__
+        key = (canonical_board(boardstr), algorithm, hname, depth_limit)
+        return key, heuristic
+
+    async def solve(self, boardstr, algorithm='A*', heuristic=None,
+                    depth_limit=-1):
+        ''' solves boardstr and returns a SolveResult, whose board is
+            boardstr as given even when the result is shared with another
+            spelling of the same board. heuristic may be a heuristic
+            function or its name in HEURISTICS (see check_request).
+        '''
+        key, heuristic = self.check_request(boardstr, algorithm, heuristic,
+                                            depth_limit)
+
+        result = self.cache.get(key)
+        if result != None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return result._replace(board=boardstr)
+
+        future = self.in_flight.get(key)
+        if future != None:
+            self.merged += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(
+                self.pool, functools.partial(
+                    solve_one, boardstr, algorithm, depth_limit, heuristic,
+                    **self.options))
+            self.in_flight[key] = future
+            self.searches += 1
+            future.add_done_callback(
+                lambda f: self.finish_search(key, f))
+        # shielded, so that one caller being cancelled does not cancel the
+        # search the others are waiting for
+        result = await asyncio.shield(future)
+        return result._replace(board=boardstr)
+
+    def finish_search(self, key, future):
+        ''' called when the search for key finishes, to move its result
+            from in_flight to the cache
+        '''
+        del self.in_flight[key]
+        if future.cancelled() or future.exception() != None:
+            return
+        result = future.result()
+        if self.cache_size > 0 and result.status in CACHEABLE:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+
+def canonical_board(boardstr):
+    ''' returns the string that parse_tiles(boardstr) would print, so that
+        different spellings of one board share a cache entry, or boardstr
+        itself if it cannot be parsed
+    '''
+    try:
+        return tiles_string(parse_tiles(boardstr))
+    except ValueError:
+        return boardstr
+
+
+async def handle_request(service, line):
+    ''' solves the JSON request in line and returns the JSON line of its
+        result. A request has a "board" and optionally an "id" (copied to
+        the result), "algorithm", "heuristic" (a name) and "depth_limit".
+        A request that cannot be read gets the status 'bad request', and
+        one whose search fails gets 'error'.
+    '''
+    request = {}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError('a request must be a JSON object')
+        if 'board' not in request:
+            raise ValueError('a request must have a board')
+        options = (str(request['board']), request.get('algorithm', 'A*'),
+                   request.get('heuristic'), request.get('depth_limit', -1))
+        service.check_request(*options)
+    except ValueError as e:
+        response = {'status': 'bad request', 'error': str(e)}
+    else:
+        try:
+            response = (await service.solve(*options))._asdict()
+        except Exception as e:
+            response = {'status': 'error', 'error': repr(e)}
+    if isinstance(request, dict) and 'id' in request:
+        response['id'] = request['id']
+    return json.dumps(response)
+
+
+async def serve_jsonl(service, reader=sys.stdin, writer=sys.stdout):
+    ''' reads requests from the file reader, one JSON object per line, and
+        writes each result to writer as soon as it is ready, so the results
+        may come out in a different order than the requests. returns when
+        reader is exhausted and every request has been answered.
+    '''
+    loop = asyncio.get_running_loop()
+    tasks = set()
+
+    async def answer(line):
+        writer.write(await handle_request(service, line) + '\n')
+        writer.flush()
+
+    while True:
+        # reading blocks, so it is done in a thread
+        line = await loop.run_in_executor(None, reader.readline)
+        if line == '':
+            break
+        if line.strip() == '':
+            continue
+        task = asyncio.ensure_future(answer(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if len(tasks) > 0:
+        await asyncio.wait(tasks)
+
+
+def main(args=None):
+    ''' runs serve_jsonl on standard input and output
+    '''
+    parser = argparse.ArgumentParser(description='Solve boards read as '
+                                     'JSON lines from standard input.')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--time-limit', type=float,
+                        help='seconds allowed per board')
+    parser.add_argument('--max-nodes', type=int,
+                        help='states allowed to be tested per board')
+    options = parser.parse_args(args)
+
+    budget = None
+    if options.max_nodes != None:
+        budget = Budget(max_nodes=options.max_nodes)
+
+    async def run():
+        async with SolverService(options.workers, options.cache_size,
+                                 time_limit=options.time_limit,
+                                 budget=budget) as service:
+            await serve_jsonl(service)
+            print(service, file=sys.stderr)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
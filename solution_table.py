@@ -0,0 +1,143 @@
+import mmap
+import os
+import struct
+import zlib
+from board import *
+
+# A table of optimal solutions for every Eight Puzzle configuration.
+#
+# The table has one byte for each of the 9! arrangements of the tiles,
+# indexed by permutation_rank. For a solvable configuration the byte holds
+# (number of moves to the goal << 2) | (index in DIRECTIONS of the first
+# move of an optimal solution); the goal itself holds 0. The other half of
+# the arrangements, which cannot be solved, hold UNSOLVABLE.
+#
+# The table is built by one breadth-first search backward from the goal,
+# which takes a few seconds, and is cached in a file that is memory-mapped
+# when loaded.
+
+# the file format, which is checked when a table is loaded:
+#   header - MAGIC, FORMAT_VERSION, unused, CRC-32 of the table
+#   then the table
+MAGIC = b'8SOL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+TABLE_SIZE = FACTORIALS[9]
+
+# the default location of the table file
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'solution_table.bin')
+
+# the entry of configurations that cannot be solved
+UNSOLVABLE = 255
+
+
+def build_solution_table():
+    ''' computes the table by a breadth-first search backward from the goal
+        and returns it as a bytearray
+    '''
+    table = bytearray([UNSOLVABLE]) * TABLE_SIZE
+    table[permutation_rank(GOAL_CODE)] = 0
+    # the packed configurations of the current level, with the blank cell
+    level = [(GOAL_CODE, 0)]
+    seen = set([GOAL_CODE])
+    distance = 0
+    while len(level) > 0:
+        distance += 1
+        next_level = []
+        for code, blank in level:
+            for d in range(4):
+                q = MOVE_TABLE[blank][d]
+                if q == -1:
+                    continue
+                tile = (code >> (4 * q)) & 15
+                new_code = code ^ (tile << (4 * q)) ^ (tile << (4 * blank))
+                if new_code in seen:
+                    continue
+                seen.add(new_code)
+                # moving the blank back the way it came leads to the goal
+                table[permutation_rank(new_code)] = ((distance << 2) |
+                                                     OPPOSITE[d])
+                next_level += [(new_code, q)]
+        level = next_level
+    return table
+
+
+def save_solution_table(table, path=DEFAULT_PATH):
+    ''' writes table to the file at path, under a temporary name that is
+        then renamed so a reader never sees a partial file
+    '''
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, zlib.crc32(table))
+    temp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(table)
+    os.replace(temp_path, path)
+
+
+def load_solution_table(path=DEFAULT_PATH):
+    ''' returns the table stored in the file at path, as a memoryview of a
+        read-only memory map. raises ValueError if the file is not a valid
+        table of the current FORMAT_VERSION.
+    '''
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) != HEADER.size + TABLE_SIZE:
+        raise ValueError(path + ': not a solution table')
+    magic, version, unused, crc = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(path + ': not a solution table')
+    if version != FORMAT_VERSION:
+        raise ValueError(path + ': solution table version ' + str(version) +
+                         ', expected ' + str(FORMAT_VERSION))
+    table = memoryview(buf)[HEADER.size:]
+    if zlib.crc32(table) != crc:
+        raise ValueError(path + ': solution table is corrupt')
+    return table
+
+
+# the table used by default_solution_table(), once it has been loaded
+_default_table = None
+
+def default_solution_table(path=DEFAULT_PATH):
+    ''' returns the solution table, loading it from path the first time it
+        is needed. If the file is missing, out of date or invalid, the table
+        is built and saved there first.
+    '''
+    global _default_table
+    if _default_table == None:
+        try:
+            table = load_solution_table(path)
+        except (OSError, ValueError):
+            table = build_solution_table()
+            try:
+                save_solution_table(table, path)
+            except OSError:
+                pass # the table can still be used from memory
+        _default_table = table
+    return _default_table
+
+
+def solution_moves(code, table=None):
+    ''' returns the list of moves ('up', 'down', 'left' or 'right') of an
+        optimal solution for the packed configuration code, or None if it
+        cannot be solved. Only one table lookup is needed per move.
+    '''
+    if table == None:
+        table = default_solution_table()
+    moves = []
+    entry = table[permutation_rank(code)]
+    if entry == UNSOLVABLE:
+        return None
+    blank = 0
+    while (code >> (4 * blank)) & 15 != 0:
+        blank += 1
+    while entry != 0:
+        d = entry & 3
+        moves += [DIRECTIONS[d]]
+        q = MOVE_TABLE[blank][d]
+        tile = (code >> (4 * q)) & 15
+        code = code ^ (tile << (4 * q)) ^ (tile << (4 * blank))
+        blank = q
+        entry = table[permutation_rank(code)]
+    return moves
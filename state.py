@@ -1,13 +1,12 @@
+import re
+import sys
 from board import *
 
-# a 2-D list of the goal state
-GOAL_TILES = [[0, 1, 2],
-              [3, 4, 5],
-              [6, 7, 8]]
+# GOAL_TILES, the 2-D list of the goal state, is defined in board.py
 
 # the list of possible moves, that moves the blank cell in the specified 
 # direction
-MOVES = ['up', 'down', 'left', 'right']
+MOVES = DIRECTIONS
 
 
 class State:
@@ -32,13 +31,15 @@ class State:
         else: # not the inital case
             # adds one to the count
             self.num_moves = predecessor.num_moves + 1
+        # the heuristic value, filled in by the searcher when it is needed
+        self.h = None
     
 
     def is_goal(self):
         '''checks if the current board is the goal state
         '''
         # returns a Boolean value if the board is the same as the GOAL_TILES
-        return self.board.tiles == GOAL_TILES
+        return self.board.is_goal()
     
    
     def generate_successors(self):
@@ -48,19 +49,41 @@ class State:
         # creates a blank list 
         successors = []
         # loops through the list of valid moves
-        for m in MOVES:
-            # creates a copy of the board
-            b = self.board.copy()
-            # checks each move to see if it is a valid move on the current 
-            # board
-            if b.move_blank(m) == True :
+        board = self.board
+        for d in range(4):
+            m = MOVES[d]
+            # gets a moved copy of the board, or None if the move is not
+            # valid on the current board
+            b = board.successor(m, d)
+            if b is not None:
                 # sets a variable to a new State object created after moving 
                 # the board
                 new = State(b, self, m)
                 # adds new board to the list of successors
                 successors += [new]
         return successors
-                
+    
+    def key(self):
+        '''returns the compact encoding of this state's board, used by
+           searchers to look the board up in a closed set
+        '''
+        return self.board.encode()
+    
+    @property
+    def size(self):
+        '''the width of this state's board
+        '''
+        return self.board.size
+    
+    def blank_cell(self):
+        '''returns the cell number of the blank on this state's board
+        '''
+        return self.board.blank_cell()
+    
+    def tile_at(self,cell):
+        '''returns the tile at the input cell number on this state's board
+        '''
+        return self.board.tile_at(cell)
     
     def __repr__(self):
         """ returns a string representation of the State object
@@ -84,25 +107,291 @@ class State:
             state = state.predecessor
         return False
 
-    def __gt__(self, other):
-        """ implements a > operator for State objects
-            that always returns True. This is used to break
-            ties when max() is called on a list of [priority, state] pairs.
-        """
-        return True
-    
     def print_moves_to(self):
         '''prints inital board and all neccessary steps to solve it, as well as
            the board at each step
         '''
-        if self.predecessor == None: # if this is the inital board, base case
-            print('initial state') # labels it the inital board
-            print(self.board) # prints the inital board
-        else: # recursive case
-            # recursively calls the method to find the rest 
-            self.predecessor.print_moves_to()
+        # collects the chain of states by following the predecessors, 
+        # rather than recursing, so long solutions cannot overflow the stack
+        chain = []
+        state = self
+        while state != None:
+            chain += [state]
+            state = state.predecessor
+        chain.reverse()
+        print('initial state') # labels it the inital board
+        print(chain[0].board) # prints the inital board
+        for state in chain[1:]:
             # prints the move needed
-            print('move the blank ' + self.move)
+            print('move the blank ' + state.move)
             # prints a copy of the board at the case
-            print(self.board)
-            
+            print(state.board)
+
+
+# Node.config holds the packed tiles in its low bits (36 on the 3x3 board)
+# and the cell of the blank above them
+BLANK_SHIFT = 36
+CODE_MASK = (1 << BLANK_SHIFT) - 1
+
+# the move code used for the initial node
+INIT_MOVE = 4
+
+
+class Node:
+    """ A memory-lean alternative to State. A Node keeps only the packed
+        configuration, its parent, a small move code (an index into MOVES)
+        and its depth (plus the heuristic value h, once a searcher has
+        computed it). Its board is rebuilt as a PackedBoard only when asked
+        for, e.g. by print_moves_to or a heuristic. Node itself is for 3x3
+        boards; node_class(size) returns a subclass for other sizes.
+    """
+    __slots__ = ('config', 'parent', 'move_code', 'depth', 'h')
+
+    # the size of the board and the values and tables for that size, kept 
+    # on the class so that they cost nothing per node
+    size = 3
+    bits = TABLES_3.bits
+    mask = TABLES_3.mask
+    blank_shift = BLANK_SHIFT
+    code_mask = CODE_MASK
+    goal_code = TABLES_3.goal_code
+    move_table = TABLES_3.move_table
+    board_class = PackedBoard
+
+    def __init__(self, config, parent, move_code):
+        """constructor for a Node object
+            inputs:
+                * config - the packed tiles, with the blank's cell in the
+                  bits above code_mask
+                * parent - the previous Node, or None
+                * move_code - the index in MOVES of the move that led here,
+                  or INIT_MOVE
+        """
+        self.config = config
+        self.parent = parent
+        self.move_code = move_code
+        if parent == None:
+            self.depth = 0
+        else:
+            self.depth = parent.depth + 1
+        self.h = None
+
+    @property
+    def board(self):
+        ''' a PackedBoard for this node's configuration, built on demand
+        '''
+        return self.board_class(self.config & self.code_mask, 
+                                self.config >> self.blank_shift)
+
+    @property
+    def predecessor(self):
+        return self.parent
+
+    @property
+    def move(self):
+        if self.move_code == INIT_MOVE:
+            return 'init'
+        return MOVES[self.move_code]
+
+    @property
+    def num_moves(self):
+        return self.depth
+
+    def is_goal(self):
+        '''checks if the current configuration is the goal state
+        '''
+        return self.config & self.code_mask == self.goal_code
+
+    def key(self):
+        '''returns the packed tiles, the same value as board.encode()
+        '''
+        return self.config & self.code_mask
+
+    def blank_cell(self):
+        '''returns the cell number of the blank
+        '''
+        return self.config >> self.blank_shift
+
+    def tile_at(self,cell):
+        '''returns the tile at the input cell number
+        '''
+        return (self.config >> (self.bits * cell)) & self.mask
+
+    def generate_successors(self):
+        '''returns a list of the Nodes reachable with one move, computed
+           directly from the move table without building any boards
+        '''
+        bits = self.bits
+        mask = self.mask
+        shift = self.blank_shift
+        code = self.config & self.code_mask
+        blank = self.config >> shift
+        moves = self.move_table[blank]
+        node_class = self.__class__
+        successors = []
+        for d in range(4):
+            q = moves[d]
+            if q != -1:
+                tile = (code >> (bits * q)) & mask
+                new_code = (code ^ (tile << (bits * q)) ^ 
+                            (tile << (bits * blank)))
+                successors += [node_class(new_code | (q << shift), self, d)]
+        return successors
+
+    def creates_cycle(self):
+        """ returns True if this Node repeats the configuration of one of
+            its ancestors, and False otherwise.
+        """
+        node = self.parent
+        while node != None:
+            if node.config == self.config:
+                return True
+            node = node.parent
+        return False
+
+    # these only use board, move, num_moves and predecessor, which Node
+    # provides as properties
+    __repr__ = State.__repr__
+    print_moves_to = State.print_moves_to
+
+
+# the Node subclasses made so far, by size
+_node_classes = {3: Node}
+
+def node_class(size):
+    ''' returns the Node class for size x size boards
+    '''
+    cls = _node_classes.get(size)
+    if cls == None:
+        tables = puzzle_tables(size)
+        shift = tables.bits * tables.num_cells
+        cls = type('Node' + str(size), (Node,),
+                   {'__slots__': (), 'size': size, 'bits': tables.bits,
+                    'mask': tables.mask, 'blank_shift': shift,
+                    'code_mask': (1 << shift) - 1,
+                    'goal_code': tables.goal_code,
+                    'move_table': tables.move_table,
+                    'board_class': packed_board_class(size)})
+        _node_classes[size] = cls
+    return cls
+
+
+def lean_state(digitstr):
+    ''' returns an initial Node whose configuration is specified by the
+        input digitstr, validated the same way as the Board constructor
+    '''
+    b = packed_board(digitstr)
+    cls = node_class(b.size)
+    return cls(b.code | (b.blank << cls.blank_shift), None, INIT_MOVE)
+
+
+# the one-letter code of each move, used by moves_string
+MOVE_LETTERS = {'up': 'U', 'down': 'D', 'left': 'L', 'right': 'R'}
+
+
+def moves_to(state):
+    ''' returns the list of moves that lead from the initial state to state
+        (a State or a Node)
+    '''
+    moves = []
+    while state.predecessor != None:
+        moves += [state.move]
+        state = state.predecessor
+    moves.reverse()
+    return moves
+
+
+def initial_state(state):
+    ''' returns the first state of the chain of predecessors of state
+    '''
+    while state.predecessor != None:
+        state = state.predecessor
+    return state
+
+
+def moves_string(moves):
+    ''' returns the compact form of the list of moves, one letter per move
+        (e.g. 'RULD')
+    '''
+    return ''.join([MOVE_LETTERS[m] for m in moves])
+
+
+def parse_moves(movestr):
+    ''' returns the list of moves in movestr, which is either the compact
+        form of moves_string or move names separated by commas or spaces.
+        raises ValueError if a move is not recognized.
+    '''
+    movestr = movestr.strip()
+    if re.search(r'[\s,]', movestr) or movestr in MOVES:
+        names = [m for m in re.split(r'[\s,]+', movestr) if m != '']
+    else:
+        letters = dict([(MOVE_LETTERS[m], m) for m in MOVES])
+        names = []
+        for c in movestr.upper():
+            if c not in letters:
+                raise ValueError('unknown move: ' + c)
+            names += [letters[c]]
+    for m in names:
+        if m not in MOVES:
+            raise ValueError('unknown move: ' + m)
+    return names
+
+
+def replay(digitstr, moves):
+    ''' a generator that yields the board given by digitstr and then a
+        new Board after each of the moves, so the snapshots of a solution
+        are only built as they are needed. raises ValueError if a move 
+        cannot be made.
+    '''
+    board = Board(digitstr)
+    yield board.copy()
+    for i in range(len(moves)):
+        if not board.move_blank(moves[i]):
+            raise ValueError('move ' + str(i + 1) + ' (' + moves[i] + 
+                             ') cannot be made')
+        yield board.copy()
+
+
+def verify_solution(digitstr, moves):
+    ''' returns True if the list of moves (or a string for parse_moves) can
+        be made in order on the board given by digitstr and leaves it in 
+        the goal configuration, and False otherwise
+    '''
+    try:
+        if isinstance(moves, str):
+            moves = parse_moves(moves)
+        for board in replay(digitstr, moves):
+            pass
+    except (AssertionError, ValueError):
+        return False
+    return board.is_goal()
+
+
+def solution_record(state):
+    ''' returns a dictionary describing the solution ending at state, with
+        the starting board, the number of moves and the compact moves,
+        ready to be written with json.dumps
+    '''
+    moves = moves_to(state)
+    return {'board': initial_state(state).board.digit_string(),
+            'num_moves': len(moves),
+            'moves': moves_string(moves)}
+
+
+def bytes_per_node(state):
+    ''' returns the number of bytes used by state itself, not counting its
+        predecessor or objects shared with other states (such as interned
+        strings and small integers). state may be a State or a Node.
+    '''
+    if isinstance(state, Node):
+        return sys.getsizeof(state) + sys.getsizeof(state.config)
+    size = sys.getsizeof(state) + sys.getsizeof(state.__dict__)
+    board = state.board
+    size += sys.getsizeof(board)
+    if isinstance(board, PackedBoard):
+        size += sys.getsizeof(board.__dict__) + sys.getsizeof(board.code)
+    else:
+        size += sys.getsizeof(board.__dict__) + sys.getsizeof(board.tiles)
+        for row in board.tiles:
+            size += sys.getsizeof(row)
+    return size
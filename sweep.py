@@ -0,0 +1,109 @@
+import array
+import collections
+from board import *
+
+# A breadth-first sweep over every configuration reachable from a 3x3
+# board, for questions about the whole state space rather than one
+# solution: how many boards are at each depth, and which are farthest.
+#
+# Unlike BFSearcher, no states or predecessor chains are kept. The visited
+# set is a bitmap with one bit per permutation_rank (9! bits, about 45 KB),
+# and each layer of the search is an array of packed configurations with a
+# parallel array of blank cells, so the largest layer (24,047 boards) takes
+# about 200 KB. Optionally a depth array with one byte per rank records how
+# far every configuration is from the start.
+
+NUM_CONFIGS = FACTORIALS[9]
+
+# the entry of the depth array for configurations that were not reached
+UNREACHED = 255
+
+# the results of a sweep
+#   * start - the digit string of the starting board
+#   * counts - counts[d] is the number of configurations d moves away
+#   * farthest - the digit strings of the configurations in the last layer
+#   * depths - a bytearray giving the depth of each configuration by
+#     permutation_rank (UNREACHED if it was not reached), or None
+SweepResult = collections.namedtuple('SweepResult',
+    ['start', 'counts', 'farthest', 'depths'])
+
+
+def sweep(digitstr, keep_depths=False):
+    ''' does a breadth-first sweep from the 3x3 board given by digitstr over
+        every configuration reachable from it, and returns a SweepResult.
+        If keep_depths is True, the depth of every configuration is kept
+        too, which takes another 363 KB.
+    '''
+    board = packed_board(digitstr)
+    if board.size != 3:
+        raise ValueError('sweeps only cover 3x3 boards')
+    visited = bytearray(NUM_CONFIGS // 8 + 1)
+    depths = None
+    if keep_depths:
+        depths = bytearray([UNREACHED]) * NUM_CONFIGS
+    rank = permutation_rank(board.code)
+    visited[rank >> 3] |= 1 << (rank & 7)
+    if keep_depths:
+        depths[rank] = 0
+
+    codes = array.array('Q', [board.code])
+    blanks = array.array('B', [board.blank])
+    counts = [1]
+    depth = 0
+    while True:
+        depth += 1
+        next_codes = array.array('Q')
+        next_blanks = array.array('B')
+        for i in range(len(codes)):
+            code = codes[i]
+            blank = blanks[i]
+            for q in NEIGHBORS[blank]:
+                tile = (code >> (4 * q)) & 15
+                new_code = code ^ (tile << (4 * q)) ^ (tile << (4 * blank))
+                rank = permutation_rank(new_code)
+                bit = 1 << (rank & 7)
+                if visited[rank >> 3] & bit:
+                    continue
+                visited[rank >> 3] |= bit
+                if keep_depths:
+                    depths[rank] = depth
+                next_codes.append(new_code)
+                next_blanks.append(q)
+        if len(next_codes) == 0:
+            break
+        counts += [len(next_codes)]
+        codes = next_codes
+        blanks = next_blanks
+
+    farthest = [PackedBoard(codes[i], blanks[i]).digit_string()
+                for i in range(len(codes))]
+    return SweepResult(board.digit_string(), counts, farthest, depths)
+
+
+def depth_histogram(boardstrs):
+    ''' returns a Counter of the number of moves in an optimal solution of
+        each 3x3 board in the iterable boardstrs (e.g. an open file with one
+        board per line), found with a single sweep from the goal. Boards
+        that cannot be solved are counted under 'unsolvable' and those that
+        cannot be read under 'invalid board'. Blank lines are skipped.
+    '''
+    depths = sweep(goal_string(3), keep_depths=True).depths
+    histogram = collections.Counter()
+    for boardstr in boardstrs:
+        boardstr = boardstr.strip()
+        if boardstr == '':
+            continue
+        try:
+            board = packed_board(boardstr)
+        except (AssertionError, ValueError):
+            histogram['invalid board'] += 1
+            continue
+        if board.size != 3:
+            histogram['invalid board'] += 1
+            continue
+        depth = depths[permutation_rank(board.code)]
+        if depth == UNREACHED:
+            histogram['unsolvable'] += 1
+        else:
+            histogram[depth] += 1
+    return histogram